@@ -1,12 +1,14 @@
-from decimal import Decimal, InvalidOperation
 from datetime import timedelta
 
 from django.contrib import admin, messages
+from django.core.cache import cache
 from django.http import HttpResponseRedirect
 from django.template.response import TemplateResponse
 from django.urls import path, reverse
 from django.utils import timezone
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Now
 
 from .models import (
     AuditFinding,
@@ -17,7 +19,9 @@ from .models import (
     UserSubscription,
     Website,
 )
-from audit.services import run_audit
+
+DASHBOARD_STATS_CACHE_KEY = "qa_admin:dashboard_stats"
+DASHBOARD_STATS_TTL = 60
 
 
 class QAAdminSite(admin.AdminSite):
@@ -35,13 +39,21 @@ class QAAdminSite(admin.AdminSite):
         return custom + urls
 
     def index(self, request, extra_context=None):
-        now = timezone.now()
-        week_ago = now - timedelta(days=7)
-        stats = {
-            "recent_audits": AuditRun.objects.filter(created_at__gte=week_ago).count(),
-            "active_subscriptions": UserSubscription.objects.filter(status=UserSubscription.STATUS_ACTIVE).count(),
-            "weekly_revenue": (Payment.objects.filter(created_at__gte=week_ago, status=Payment.STATUS_SUCCEEDED).aggregate(total=Sum("amount_cents"))["total"] or 0) / 100,
-        }
+        stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+        if stats is None:
+            now = timezone.now()
+            week_ago = now - timedelta(days=7)
+            payments = Payment.objects.filter(created_at__gte=week_ago).aggregate(
+                total=Sum("amount_cents", filter=Q(status=Payment.STATUS_SUCCEEDED)),
+                failed=Count("id", filter=Q(status=Payment.STATUS_FAILED)),
+            )
+            stats = {
+                "recent_audits": AuditRun.objects.filter(created_at__gte=week_ago).count(),
+                "active_subscriptions": UserSubscription.objects.filter(status=UserSubscription.STATUS_ACTIVE).count(),
+                "weekly_revenue": (payments["total"] or 0) / 100,
+                "weekly_failed_payments": payments["failed"],
+            }
+            cache.set(DASHBOARD_STATS_CACHE_KEY, stats, DASHBOARD_STATS_TTL)
         extra_context = extra_context or {}
         extra_context.update({
             "stats": stats,
@@ -67,8 +79,10 @@ class QAAdminSite(admin.AdminSite):
 
     def run_sample_audit(self, request):
         if request.method == "POST":
+            from audit.services import enqueue_audit
+
             website, _ = Website.objects.get_or_create(url="https://qa-tool-wg8f.onrender.com/")
-            audit = run_audit(website, user=request.user if request.user.is_authenticated else None)
+            audit = enqueue_audit(website, user=request.user if request.user.is_authenticated else None)
             self.message_user(request, f"Sample audit queued with status {audit.status}.")
             return HttpResponseRedirect(reverse(f"{self.name}:index"))
         context = dict(self.each_context(request), action="Run sample audit")
@@ -76,7 +90,7 @@ class QAAdminSite(admin.AdminSite):
 
     def reset_trials(self, request):
         if request.method == "POST":
-            count = UserSubscription.objects.filter(is_trial=True).update(audits_used=0)
+            count = UserSubscription.objects.filter(is_trial=True).update(audits_used=0, updated_at=Now())
             self.message_user(request, f"Reset usage for {count} trial subscriptions.")
             return HttpResponseRedirect(reverse(f"{self.name}:index"))
         context = dict(self.each_context(request), action="Reset trial usage")
@@ -95,6 +109,9 @@ class AuditFindingInline(admin.TabularInline):
     fields = ("category", "severity", "title")
     readonly_fields = fields
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("audit__website")
+
 
 class AuditMetricInline(admin.TabularInline):
     model = AuditMetric
@@ -102,42 +119,51 @@ class AuditMetricInline(admin.TabularInline):
     fields = ("label", "value")
     readonly_fields = fields
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("audit__website")
+
 
 @admin.register(AuditRun)
 class AuditRunAdmin(admin.ModelAdmin):
     list_display = ("website", "status", "score", "created_at", "created_by")
+    list_select_related = ("website", "created_by")
     list_filter = ("status", "created_at")
     search_fields = ("website__name", "website__url", "summary")
     date_hierarchy = "created_at"
     inlines = [AuditFindingInline, AuditMetricInline]
+    # Set by the queue when the audit is billed; a <select> here would render every subscription.
+    readonly_fields = ("billed_subscription",)
     actions = ["mark_completed", "recalculate_score"]
 
     @admin.action(description="Mark selected audits as completed")
     def mark_completed(self, request, queryset):
-        updated = queryset.update(status=AuditRun.STATUS_COMPLETED)
+        updated = queryset.update(status=AuditRun.STATUS_COMPLETED, updated_at=Now())
         self.message_user(request, f"{updated} audits marked as completed.")
 
     @admin.action(description="Recalculate audit score")
     def recalculate_score(self, request, queryset):
-        recalculated = 0
-        for run in queryset.select_related("website"):
+        now = timezone.now()
+        updated_runs = []
+        for run in queryset.select_related("website").prefetch_related("metrics"):
             metrics = list(run.metrics.all())
             if not metrics:
                 continue
             numeric_values = []
             for metric in metrics:
                 try:
-                    numeric_values.append(float(Decimal(metric.value)))
-                except (InvalidOperation, TypeError, ValueError):
+                    numeric_values.append(float(metric.value))
+                except (TypeError, ValueError):
                     continue
             if not numeric_values:
                 continue
             new_score = max(0, min(100, int(round(sum(numeric_values) / len(numeric_values)))))
             run.score = new_score
-            run.save(update_fields=["score", "updated_at"])
-            recalculated += 1
-        if recalculated:
-            self.message_user(request, f"Recalculated {recalculated} audit scores.")
+            run.updated_at = now
+            updated_runs.append(run)
+        if updated_runs:
+            with transaction.atomic():
+                AuditRun.objects.bulk_update(updated_runs, ["score", "updated_at"], batch_size=500)
+            self.message_user(request, f"Recalculated {len(updated_runs)} audit scores.")
         else:
             self.message_user(request, "No metrics available to recalculate.", level=messages.WARNING)
 
@@ -145,15 +171,23 @@ class AuditRunAdmin(admin.ModelAdmin):
 @admin.register(AuditFinding)
 class AuditFindingAdmin(admin.ModelAdmin):
     list_display = ("audit", "category", "severity", "title")
+    list_select_related = ("audit", "audit__website")
     list_filter = ("category", "severity")
     search_fields = ("title", "description")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("audit__website")
+
 
 @admin.register(AuditMetric)
 class AuditMetricAdmin(admin.ModelAdmin):
     list_display = ("audit", "label", "value")
+    list_select_related = ("audit", "audit__website")
     search_fields = ("label", "value")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("audit__website")
+
 
 @admin.register(SubscriptionPlan)
 class SubscriptionPlanAdmin(admin.ModelAdmin):
@@ -165,52 +199,82 @@ class SubscriptionPlanAdmin(admin.ModelAdmin):
 
     @admin.action(description="Activate selected plans")
     def activate_plans(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=Now())
+        # update() sends no post_save, so clear the plan caches here.
+        SubscriptionPlan.invalidate_plan_cache()
         self.message_user(request, f"{updated} plans activated.")
 
     @admin.action(description="Deactivate selected plans")
     def deactivate_plans(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=Now())
+        SubscriptionPlan.invalidate_plan_cache()
         self.message_user(request, f"{updated} plans deactivated.")
 
 
 @admin.register(UserSubscription)
 class UserSubscriptionAdmin(admin.ModelAdmin):
     list_display = ("user", "plan", "status", "started_at", "current_period_end", "audits_used", "is_trial")
+    list_select_related = ("user", "plan")
     list_filter = ("status", "is_trial", "plan__billing_interval")
     search_fields = ("user__username", "user__email", "plan__name")
     date_hierarchy = "started_at"
     actions = ["reset_usage", "refresh_periods"]
+    changelist_fields = (
+        "id",
+        "user",
+        "plan",
+        "status",
+        "started_at",
+        "current_period_start",
+        "current_period_end",
+        "audits_used",
+        "is_trial",
+        "user__username",
+        "plan__name",
+        "plan__billing_interval",
+        "plan__trial_days",
+    )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related("user", "plan")
+        match = request.resolver_match
+        if match and match.url_name and match.url_name.endswith("_changelist"):
+            # The change form needs every column; only narrow the list view and its actions.
+            queryset = queryset.only(*self.changelist_fields)
+        return queryset
 
     @admin.action(description="Reset audit usage to zero")
     def reset_usage(self, request, queryset):
-        updated = queryset.update(audits_used=0)
+        updated = queryset.update(audits_used=0, updated_at=Now())
         self.message_user(request, f"Reset usage for {updated} subscriptions.")
 
     @admin.action(description="Refresh billing periods")
     def refresh_periods(self, request, queryset):
-        refreshed = 0
-        for subscription in queryset.select_related("plan"):
-            subscription.refresh_period()
-            refreshed += 1
+        now = timezone.now()
+        subscriptions = list(queryset.select_related("plan"))
+        changed = [subscription for subscription in subscriptions if subscription._compute_refresh(now)]
+        if changed:
+            UserSubscription.objects.bulk_update(changed, UserSubscription.REFRESH_FIELDS, batch_size=500)
+        refreshed = len(subscriptions)
         self.message_user(request, f"Refreshed periods for {refreshed} subscriptions.")
 
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("user", "plan", "amount_cents", "currency", "status", "provider", "created_at")
+    list_select_related = ("user", "plan")
     list_filter = ("status", "provider", "currency")
     search_fields = ("user__username", "user__email", "provider_reference")
     actions = ["mark_succeeded", "mark_failed"]
 
     @admin.action(description="Mark selected payments as succeeded")
     def mark_succeeded(self, request, queryset):
-        updated = queryset.update(status=Payment.STATUS_SUCCEEDED)
+        updated = queryset.update(status=Payment.STATUS_SUCCEEDED, updated_at=Now())
         self.message_user(request, f"{updated} payments marked as succeeded.")
 
     @admin.action(description="Mark selected payments as failed")
     def mark_failed(self, request, queryset):
-        updated = queryset.update(status=Payment.STATUS_FAILED)
+        updated = queryset.update(status=Payment.STATUS_FAILED, updated_at=Now())
         self.message_user(request, f"{updated} payments marked as failed.")
 
 
@@ -10,7 +10,13 @@ def _bootstrap_subscription_plans(sender, **kwargs):
         pass
 
 
+_ADMIN_BOOTSTRAPPED = False
+
+
 def _ensure_default_admin():
+    global _ADMIN_BOOTSTRAPPED
+    if _ADMIN_BOOTSTRAPPED:
+        return
     try:
         from django.contrib.auth import get_user_model
         from django.db.utils import OperationalError, ProgrammingError
@@ -25,6 +31,7 @@ def _ensure_default_admin():
     try:
         if not User.objects.filter(username=username).exists():
             User.objects.create_superuser(username=username, email=email, password=password)
+        _ADMIN_BOOTSTRAPPED = True
     except (OperationalError, ProgrammingError):
         pass
 
@@ -33,12 +40,46 @@ def _ensure_default_admin_post_migrate(sender, **kwargs):
     _ensure_default_admin()
 
 
+def _invalidate_previous_scores(sender, instance, created=False, **kwargs):
+    # A freshly created pending run cannot change the completed-score history.
+    if created and instance.status != instance.STATUS_COMPLETED:
+        return
+    from .services import invalidate_previous_scores
+
+    invalidate_previous_scores(instance.website_id)
+
+
+def _touch_parent_audit(sender, instance, origin=None, **kwargs):
+    # Cached PDFs are keyed on AuditRun.updated_at, so finding/metric edits must bump it. Rows removed
+    # by deleting the audit itself are skipped: there is nothing left to touch.
+    if origin is not None:
+        origin_model = getattr(origin, "model", None) or type(origin)
+        if origin_model is not sender:
+            return
+    from django.utils import timezone
+
+    from .models import AuditRun
+
+    AuditRun.objects.filter(pk=instance.audit_id).update(updated_at=timezone.now())
+
+
+def _invalidate_plan_cache(sender, **kwargs):
+    sender.invalidate_plan_cache()
+
+
 class AuditConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'audit'
 
     def ready(self):
-        from django.db.models.signals import post_migrate
+        from django.db.models.signals import post_delete, post_migrate, post_save
 
         post_migrate.connect(_bootstrap_subscription_plans, sender=self, weak=False)
         post_migrate.connect(_ensure_default_admin_post_migrate, sender=self, weak=False)
+        post_save.connect(_invalidate_previous_scores, sender="audit.AuditRun", weak=False)
+        post_delete.connect(_invalidate_previous_scores, sender="audit.AuditRun", weak=False)
+        for related in ("audit.AuditFinding", "audit.AuditMetric"):
+            post_save.connect(_touch_parent_audit, sender=related, weak=False)
+            post_delete.connect(_touch_parent_audit, sender=related, weak=False)
+        post_save.connect(_invalidate_plan_cache, sender="audit.SubscriptionPlan", weak=False)
+        post_delete.connect(_invalidate_plan_cache, sender="audit.SubscriptionPlan", weak=False)
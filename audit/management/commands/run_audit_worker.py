@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from audit.services import claim_next_audit, fail_stale_audits, process_audit
+
+
+class Command(BaseCommand):
+    help = "Run queued audits (AUDIT_USE_WORKER=1). Use --once from a scheduled task to drain the queue and exit."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once no pending audits remain.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            fail_stale_audits()
+            audit = claim_next_audit()
+            if audit is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+            process_audit(audit)
+            processed += 1
+        self.stdout.write(f"Processed {processed} audit(s).")
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-14 07:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_subscriptionplan_payment_usersubscription'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditrun',
+            index=models.Index(fields=['-created_at'], name='audit_run_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditrun',
+            index=models.Index(fields=['status', '-created_at'], name='audit_run_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payment_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(fields=['status', 'is_trial'], name='user_sub_status_trial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(fields=['user', 'status', '-current_period_end'], name='user_sub_active_idx'),
+        ),
+    ]
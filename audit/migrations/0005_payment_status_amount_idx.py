@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS payment_status_amount_idx "
+        "ON audit_payment (status, created_at) INCLUDE (amount_cents)"
+    )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS payment_status_amount_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("audit", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
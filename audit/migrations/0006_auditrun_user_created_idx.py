@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-14 07:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_payment_status_amount_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditrun',
+            index=models.Index(fields=['created_by', '-created_at'], name='audit_run_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-14 07:44
+
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+
+# Frozen copy of audit.models.TLD_TO_ISO as of this migration, so later edits to the model module
+# cannot change (or break) what the backfill writes.
+TLD_TO_ISO = {
+    "com": "US",
+    "net": "US",
+    "org": "US",
+    "io": "GB",
+    "co": "US",
+    "ai": "US",
+    "app": "US",
+    "dev": "US",
+    "us": "US",
+    "ca": "CA",
+    "uk": "GB",
+    "ie": "IE",
+    "de": "DE",
+    "fr": "FR",
+    "nl": "NL",
+    "es": "ES",
+    "it": "IT",
+    "za": "ZA",
+    "ng": "NG",
+    "ke": "KE",
+    "in": "IN",
+    "sg": "SG",
+    "au": "AU",
+    "nz": "NZ",
+    "br": "BR",
+    "ar": "AR",
+    "mx": "MX",
+    "jp": "JP",
+}
+
+
+def _iso_code_for_url(url):
+    try:
+        host = urlsplit(url or "").hostname or ""
+    except ValueError:
+        return ""
+    return TLD_TO_ISO.get(host.rpartition(".")[2], "")
+
+
+def backfill_iso_codes(apps, schema_editor):
+    Website = apps.get_model("audit", "Website")
+    websites = list(Website.objects.only("id", "url"))
+    for website in websites:
+        website.iso_code = _iso_code_for_url(website.url)
+    Website.objects.bulk_update(websites, ["iso_code"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0006_auditrun_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='iso_code',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=2),
+        ),
+        migrations.RunPython(backfill_iso_codes, migrations.RunPython.noop),
+    ]
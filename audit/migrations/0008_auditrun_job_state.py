@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-14 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0007_website_iso_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditrun',
+            name='billed_subscription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billed_audits', to='audit.usersubscription'),
+        ),
+        migrations.AlterField(
+            model_name='auditrun',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
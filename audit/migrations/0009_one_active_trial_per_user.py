@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-14 07:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cancel_duplicate_trials(apps, schema_editor):
+    # Keep each user's newest active trial so the unique constraint can be created.
+    UserSubscription = apps.get_model("audit", "UserSubscription")
+    active_trials = UserSubscription.objects.filter(is_trial=True, status="active").order_by("user_id", "-created_at")
+    seen_users = set()
+    duplicate_ids = []
+    for subscription_id, user_id in active_trials.values_list("id", "user_id"):
+        if user_id in seen_users:
+            duplicate_ids.append(subscription_id)
+        seen_users.add(user_id)
+    UserSubscription.objects.filter(id__in=duplicate_ids).update(status="cancelled")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0008_auditrun_job_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_trials, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usersubscription',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_trial', True), ('status', 'active')), fields=('user',), name='user_sub_one_active_trial'),
+        ),
+    ]
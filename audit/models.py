@@ -1,14 +1,75 @@
 from datetime import timedelta
+from urllib.parse import urlsplit
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
+_CURRENCY_FMT = {
+    "USD": "${:,.2f}".format,
+}
+
+ACTIVE_PLANS_CACHE_KEY = "plans:active:v1"
+PLAN_CATALOG_CACHE_KEY = "plans:catalog:v1"
+PLANS_CACHE_TTL = 600
+
+# Keyed on (is_usd, has_fraction).
+_PRICE_FMT = {
+    (True, True): lambda currency, cents: f"${cents / 100:.2f}",
+    (True, False): lambda currency, cents: f"${cents // 100}",
+    (False, True): lambda currency, cents: f"{currency} {cents / 100:.2f}",
+    (False, False): lambda currency, cents: f"{currency} {cents // 100}",
+}
+
+
+TLD_TO_ISO = {
+    "com": "US",
+    "net": "US",
+    "org": "US",
+    "io": "GB",
+    "co": "US",
+    "ai": "US",
+    "app": "US",
+    "dev": "US",
+    "us": "US",
+    "ca": "CA",
+    "uk": "GB",
+    "ie": "IE",
+    "de": "DE",
+    "fr": "FR",
+    "nl": "NL",
+    "es": "ES",
+    "it": "IT",
+    "za": "ZA",
+    "ng": "NG",
+    "ke": "KE",
+    "in": "IN",
+    "sg": "SG",
+    "au": "AU",
+    "nz": "NZ",
+    "br": "BR",
+    "ar": "AR",
+    "mx": "MX",
+    "jp": "JP",
+}
+
+
+def iso_code_for_url(url):
+    """Region ISO code for ``url``'s TLD, or "" when the TLD is not mapped."""
+    try:
+        host = urlsplit(url or "").hostname or ""
+    except ValueError:
+        return ""
+    return TLD_TO_ISO.get(host.rpartition(".")[2], "")
+
 
 class Website(models.Model):
     name = models.CharField(max_length=255, blank=True)
     url = models.URLField(unique=True)
+    # Derived from the URL on save so the dashboard can GROUP BY region in SQL.
+    iso_code = models.CharField(max_length=2, blank=True, db_index=True, editable=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -16,16 +77,26 @@ class Website(models.Model):
     def __str__(self):
         return self.name or self.url
 
+    def save(self, *args, **kwargs):
+        self.iso_code = iso_code_for_url(self.url)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "url" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "iso_code"}
+        super().save(*args, **kwargs)
+
 
 class AuditRun(models.Model):
     STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
     STATUS_COMPLETED = "completed"
     STATUS_FAILED = "failed"
     STATUS_CHOICES = [
         (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
         (STATUS_COMPLETED, "Completed"),
         (STATUS_FAILED, "Failed"),
     ]
+    IN_PROGRESS_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
 
     website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name="audits")
     url = models.URLField()
@@ -36,6 +107,14 @@ class AuditRun(models.Model):
         blank=True,
         related_name="audit_runs",
     )
+    # Charged once the queued audit completes; the pending row itself is the durable job record.
+    billed_subscription = models.ForeignKey(
+        "UserSubscription",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="billed_audits",
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     summary = models.TextField(blank=True)
     score = models.PositiveIntegerField(default=0)
@@ -47,6 +126,11 @@ class AuditRun(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="audit_run_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="audit_run_status_created_idx"),
+            models.Index(fields=["created_by", "-created_at"], name="audit_run_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"Audit {self.website} @ {self.created_at:%Y-%m-%d %H:%M}"
@@ -117,16 +201,11 @@ class SubscriptionPlan(models.Model):
         return self.name
 
     def display_price(self):
-        if self.price_cents == 0:
+        cents = self.price_cents
+        if cents == 0:
             return "Free"
-        if self.currency.upper() == "USD":
-            amount = self.price_cents / 100
-            if self.price_cents % 100:
-                return f"${amount:.2f}"
-            return f"${int(amount)}"
-        if self.price_cents % 100:
-            return f"{self.currency} {self.price_cents / 100:.2f}"
-        return f"{self.currency} {self.price_cents // 100}"
+        fmt = _PRICE_FMT[(self.currency.upper() == "USD", cents % 100 != 0)]
+        return fmt(self.currency, cents)
 
     def period_delta(self):
         if self.billing_interval == self.BILLING_TRIAL:
@@ -139,8 +218,25 @@ class SubscriptionPlan(models.Model):
 
     @classmethod
     def get_trial_plan(cls):
+        # Served from the cached active plans; only a deactivated trial plan falls through to the DB.
+        for plan in cls.active_plans():
+            if plan.slug == "free-trial":
+                return plan
         return cls.objects.filter(slug="free-trial").first()
 
+    @classmethod
+    def active_plans(cls):
+        """Active plans in display order, cached; saves and deletes clear it (see apps.py)."""
+        return cache.get_or_set(
+            ACTIVE_PLANS_CACHE_KEY,
+            lambda: list(cls.objects.filter(is_active=True).order_by("sort_order")),
+            PLANS_CACHE_TTL,
+        )
+
+    @classmethod
+    def invalidate_plan_cache(cls):
+        cache.delete_many([ACTIVE_PLANS_CACHE_KEY, PLAN_CATALOG_CACHE_KEY])
+
     @classmethod
     def bootstrap_defaults(cls):
         defaults = [
@@ -193,23 +289,58 @@ class SubscriptionPlan(models.Model):
                 ],
             },
         ]
+        existing = {plan.slug: plan for plan in cls.objects.filter(slug__in=[data["slug"] for data in defaults])}
+        to_create = []
+        to_update = []
+        update_fields = set()
         for data in defaults:
-            slug = data["slug"]
-            obj, created = cls.objects.get_or_create(slug=slug, defaults=data)
-            if not created:
-                update_fields = {k: v for k, v in data.items() if getattr(obj, k) != v}
-                if update_fields:
-                    for key, val in update_fields.items():
-                        setattr(obj, key, val)
-                    obj.save()
+            obj = existing.get(data["slug"])
+            if obj is None:
+                to_create.append(cls(**data))
+                continue
+            changed = {k: v for k, v in data.items() if getattr(obj, k) != v}
+            if changed:
+                for key, val in changed.items():
+                    setattr(obj, key, val)
+                update_fields.update(changed.keys())
+                to_update.append(obj)
+        if to_create:
+            cls.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            now = timezone.now()
+            for obj in to_update:
+                obj.updated_at = now
+            cls.objects.bulk_update(to_update, fields=[*sorted(update_fields), "updated_at"])
+        if to_create or to_update:
+            # Bulk writes skip post_save.
+            cls.invalidate_plan_cache()
 
 
 class UserSubscriptionManager(models.Manager):
+    ACTIVE_FIELDS = (
+        "id",
+        "user",
+        "plan",
+        "status",
+        "current_period_start",
+        "current_period_end",
+        "audits_used",
+        "is_trial",
+        "plan__name",
+        "plan__slug",
+        "plan__audit_quota",
+        "plan__billing_interval",
+        "plan__trial_days",
+        "plan__price_cents",
+    )
+
     def active_for_user(self, user):
         now = timezone.now()
         return (
             self.filter(user=user, status=UserSubscription.STATUS_ACTIVE)
             .filter(Q(current_period_end__isnull=True) | Q(current_period_end__gte=now))
+            .select_related("plan")
+            .only(*self.ACTIVE_FIELDS)
             .order_by("-current_period_end", "-created_at")
             .first()
         )
@@ -240,21 +371,39 @@ class UserSubscription(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "is_trial"], name="user_sub_status_trial_idx"),
+            models.Index(fields=["user", "status", "-current_period_end"], name="user_sub_active_idx"),
+        ]
+        constraints = [
+            # Concurrent first visits race in ensure_trial(); the database keeps one active trial per user.
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=Q(is_trial=True, status="active"),
+                name="user_sub_one_active_trial",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} → {self.plan.name}"
 
-    def refresh_period(self):
-        if not self.plan:
-            return
-        now = timezone.now()
+    REFRESH_FIELDS = ["current_period_start", "current_period_end", "audits_used", "updated_at"]
+
+    def _compute_refresh(self, now):
+        # Timestamp first: a running period returns without touching (or lazily loading) the plan.
         if self.current_period_end and self.current_period_end > now:
-            return
-        delta = self.plan.period_delta()
+            return False
+        if not self.plan:
+            return False
         self.current_period_start = now
-        self.current_period_end = now + delta
+        self.current_period_end = now + self.plan.period_delta()
         self.audits_used = 0
-        self.save(update_fields=["current_period_start", "current_period_end", "audits_used", "updated_at"])
+        self.updated_at = now
+        return True
+
+    def refresh_period(self):
+        if self._compute_refresh(timezone.now()):
+            self.save(update_fields=self.REFRESH_FIELDS)
 
     def remaining_audits(self):
         if self.plan.audit_quota is None:
@@ -262,17 +411,27 @@ class UserSubscription(models.Model):
         value = self.plan.audit_quota - self.audits_used
         return max(value, 0)
 
+    def usage_percent(self):
+        quota = self.plan.audit_quota
+        if not quota or quota <= 0:
+            return None
+        return min(100, int(round((self.audits_used / quota) * 100)))
+
     def increment_usage(self):
+        # Single guarded UPDATE: concurrent audit workers can't lose increments or overshoot the quota.
         quota = self.plan.audit_quota
-        if quota is None or self.audits_used < quota:
+        rows = UserSubscription.objects.filter(pk=self.pk)
+        if quota is not None:
+            rows = rows.filter(audits_used__lt=quota)
+        if rows.update(audits_used=F("audits_used") + 1, updated_at=timezone.now()):
             self.audits_used += 1
-            self.save(update_fields=["audits_used", "updated_at"])
 
-    def has_capacity(self):
+    def has_capacity(self, reserved=0):
+        """``reserved`` counts audits already queued but not yet billed."""
         quota = self.plan.audit_quota
         if quota is None:
             return True
-        return self.audits_used < quota
+        return self.audits_used + reserved < quota
 
     @classmethod
     def ensure_trial(cls, user):
@@ -281,21 +440,42 @@ class UserSubscription(models.Model):
             plan = SubscriptionPlan.objects.filter(billing_interval=SubscriptionPlan.BILLING_TRIAL).first()
         if not plan:
             return None
-        existing = cls.objects.filter(user=user, plan=plan, status=cls.STATUS_ACTIVE).order_by("-created_at").first()
+        existing = (
+            cls.objects.select_related("plan")
+            .filter(user=user, plan=plan, status=cls.STATUS_ACTIVE)
+            .order_by("-created_at")
+            .first()
+        )
         if existing:
             return existing
         now = timezone.now()
-        subscription = cls.objects.create(
-            user=user,
-            plan=plan,
-            status=cls.STATUS_ACTIVE,
-            started_at=now,
-            current_period_start=now,
-            current_period_end=now + plan.period_delta(),
-            audits_used=AuditRun.objects.filter(created_by=user).count(),
-            is_trial=True,
-        )
-        return subscription
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    user=user,
+                    plan=plan,
+                    status=cls.STATUS_ACTIVE,
+                    started_at=now,
+                    current_period_start=now,
+                    current_period_end=now + plan.period_delta(),
+                    audits_used=AuditRun.objects.filter(created_by=user).count(),
+                    is_trial=True,
+                )
+        except IntegrityError:
+            # Another request created the trial first (user_sub_one_active_trial); use that one.
+            return (
+                cls.objects.select_related("plan")
+                .filter(user=user, is_trial=True, status=cls.STATUS_ACTIVE)
+                .first()
+            )
+
+    @classmethod
+    def upsert_for_plan(cls, user, plan, existing=None):
+        """Renew ``existing`` when it is already on ``plan``; otherwise start a new subscription."""
+        if existing and existing.plan_id == plan.id:
+            existing.refresh_period()
+            return existing
+        return cls.start_new(user, plan)
 
     @classmethod
     def start_new(cls, user, plan):
@@ -337,6 +517,9 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="payment_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} → {self.plan.name} ({self.status})"
@@ -344,6 +527,7 @@ class Payment(models.Model):
     @property
     def display_amount(self):
         amount = self.amount_cents / 100
-        if self.currency.upper() == "USD":
-            return f"${amount:,.2f}"
+        fmt = _CURRENCY_FMT.get(self.currency.upper())
+        if fmt:
+            return fmt(amount)
         return f"{self.currency} {amount:,.2f}"
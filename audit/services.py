@@ -1,18 +1,31 @@
-import json
+import codecs
+import http.cookiejar
+import logging
 import re
-import ssl
+import socket
+import threading
 import time
-import urllib.request
-from collections import Counter
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
+from datetime import timedelta
 from html import escape
 from html.parser import HTMLParser
+from functools import lru_cache
+from hashlib import md5
 from io import BytesIO
+from itertools import chain
 from random import Random
-from typing import Dict, Iterable, List, Optional, Tuple
-from urllib.error import HTTPError
-from urllib.parse import urljoin, urlparse
-
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+
+import requests
+import urllib3
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.utils import timezone
 from django.utils.text import Truncator
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.lineplots import LinePlot
@@ -25,8 +38,119 @@ from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover - optional accelerator
+    LexborHTMLParser = None
+
+from .models import AuditFinding, AuditMetric, AuditRun, UserSubscription, Website
+
+logger = logging.getLogger(__name__)
+
+# getaddrinfo() does not expose record TTLs, so entries expire after a short fixed window instead.
+_DNS_TTL_SECONDS = 30
+_DNS_CACHE_SIZE = 256
+_dns_cache: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = OrderedDict()
+_dns_lock = threading.Lock()
+
+
+def _resolve_cached(host: str, port: int) -> List[str]:
+    """Addresses for ``host`` from a small LRU with expiry; used only by the audit HTTP adapter."""
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            _dns_cache.move_to_end(key)
+            return entry[1]
+    infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    with _dns_lock:
+        _dns_cache[key] = (now + _DNS_TTL_SECONDS, addresses)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > _DNS_CACHE_SIZE:
+            _dns_cache.popitem(last=False)
+    return addresses
+
+
+class _CachedDNSConnectionMixin:
+    """Connects to cached addresses; TLS SNI and certificate checks still use ``self.host``."""
+
+    def _new_conn(self):
+        # _dns_host is urllib3 2.x internals (pinned in requirements.txt); without it, connect normally.
+        if not hasattr(self, "_dns_host"):
+            return super()._new_conn()
+        dns_host = self._dns_host
+        try:
+            addresses = _resolve_cached(dns_host, self.port)
+        except OSError:
+            return super()._new_conn()  # let urllib3 raise its usual NameResolutionError
+        last_error = None
+        for address in addresses:
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except NewConnectionError as exc:
+                last_error = exc
+            finally:
+                self._dns_host = dns_host
+        raise last_error
+
+
+class _CachedDNSHTTPConnection(_CachedDNSConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, urllib3.connection.HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+class _AuditHTTPAdapter(HTTPAdapter):
+    """Pooled adapter whose connections share the DNS cache; nothing else in the process is affected."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDNSHTTPConnectionPool,
+            "https": _CachedDNSHTTPSConnectionPool,
+        }
+
+
+# TLS verification reuses the SSLContext requests preloads once per process
+# (requests >= 2.32), so no per-request context is built here.
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = "QA-Tool/1.0"
+# The session is shared by every audit and user: never store (or replay) cookies from audited sites.
+_SESSION.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+_ADAPTER = _AuditHTTPAdapter(
+    pool_connections=getattr(settings, "AUDIT_HTTP_POOL_CONNECTIONS", 16),
+    pool_maxsize=getattr(settings, "AUDIT_HTTP_POOL_MAXSIZE", 32),
+    max_retries=0,
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+_FETCH_WORKERS = 8
+# Shared by every audit in the process (request threads, the background queue and
+# multi-page runs) so concurrent audits cannot multiply outbound probe threads.
+_FETCH_POOL = ThreadPoolExecutor(max_workers=_FETCH_WORKERS, thread_name_prefix="audit-fetch")
+
+
+_ICON_RELS = frozenset({"icon", "apple-touch-icon", "mask-icon"})
 
-from .models import AuditFinding, AuditMetric, AuditRun, Website
+
+def _is_icon_rel(rel: str) -> bool:
+    return not _ICON_RELS.isdisjoint(rel.lower().split())
 
 
 @dataclass
@@ -38,6 +162,42 @@ class ParsedPage:
     images: List[Tuple[str, str]] = field(default_factory=list)  # (src, alt)
     headings: List[Tuple[str, str]] = field(default_factory=list)  # (tag, text)
     forms: int = 0
+    has_icon: bool = False
+    has_meta_description: bool = False
+    has_h1: bool = False
+    missing_alt_count: int = 0
+
+    def __post_init__(self):
+        # Parsers set the flags as they go; this covers pages built from ready-made meta/heading/image
+        # data (including legacy ``link::<rel>`` meta keys).
+        if self.meta:
+            self.has_icon = self.has_icon or any(
+                key.startswith("link::") and _is_icon_rel(key[6:]) for key in self.meta
+            )
+            self.has_meta_description = self.has_meta_description or bool(self.meta.get("description"))
+        if self.headings:
+            self.has_h1 = self.has_h1 or any(tag == "h1" for tag, _ in self.headings)
+        if self.images and not self.missing_alt_count:
+            self.missing_alt_count = sum(1 for _, alt in self.images if not alt.strip())
+
+
+_INTERESTING_TAGS = frozenset({"title", "a", "img", "h1", "h2", "h3", "form", "meta", "link"})
+_HEADING_TAGS = frozenset({"h1", "h2", "h3"})
+
+
+def _get(attrs: List[Tuple[str, Optional[str]]], key: str) -> Optional[str]:
+    for name, value in attrs:
+        if name == key:
+            return value
+    return None
+
+
+MAX_PARSED_LINKS = 500
+MAX_PARSED_IMAGES = 200
+
+
+class _Done(Exception):
+    """Raised from parser callbacks once nothing further on the page can change the audit."""
 
 
 class _PageParser(HTMLParser):
@@ -45,50 +205,88 @@ class _PageParser(HTMLParser):
         super().__init__()
         self.page = ParsedPage(url="")
         self._current_data_stack: List[str] = []
+        self._buf: List[str] = []
 
     def handle_starttag(self, tag, attrs):
-        attrs_dict = dict(attrs)
+        if tag not in _INTERESTING_TAGS:
+            return
 
         if tag == "title":
-            self._current_data_stack.append("title")
+            self._push("title")
         elif tag == "a":
-            href = attrs_dict.get("href")
-            if href:
+            href = _get(attrs, "href")
+            if href and len(self.page.links) < MAX_PARSED_LINKS:
                 self.page.links.append(href)
+                self._check_done()
         elif tag == "img":
-            src = attrs_dict.get("src", "")
-            alt = attrs_dict.get("alt", "")
-            self.page.images.append((src, alt))
-        elif tag in {"h1", "h2", "h3"}:
-            self._current_data_stack.append(tag)
+            if len(self.page.images) < MAX_PARSED_IMAGES:
+                alt = _get(attrs, "alt") or ""
+                self.page.images.append((_get(attrs, "src") or "", alt))
+                if not alt.strip():
+                    self.page.missing_alt_count += 1
+                self._check_done()
+        elif tag in _HEADING_TAGS:
+            self._push(tag)
         elif tag == "form":
             self.page.forms += 1
         elif tag == "meta":
-            name = attrs_dict.get("name") or attrs_dict.get("property")
-            content = attrs_dict.get("content")
+            name = _get(attrs, "name") or _get(attrs, "property")
+            content = _get(attrs, "content")
             if name and content:
-                self.page.meta[name.lower()] = content
-        elif tag == "link":
-            rel = attrs_dict.get("rel")
-            href = attrs_dict.get("href")
-            if rel and href:
-                self.page.meta.setdefault(f"link::{','.join(rel)}", href)
+                name = name.lower()
+                self.page.meta[name] = content
+                if name == "description":
+                    self.page.has_meta_description = True
+        elif tag == "link" and not self.page.has_icon:
+            rel = _get(attrs, "rel")
+            if rel and _get(attrs, "href") and _is_icon_rel(rel):
+                self.page.has_icon = True
 
     def handle_endtag(self, tag):
         if self._current_data_stack and self._current_data_stack[-1] == tag:
+            self._flush()
             self._current_data_stack.pop()
+            self._check_done()
+
+    def _check_done(self):
+        page = self.page
+        if (
+            len(page.links) >= MAX_PARSED_LINKS
+            and len(page.images) >= MAX_PARSED_IMAGES
+            and page.title is not None
+            and page.has_h1
+            and page.has_meta_description
+            and page.has_icon
+        ):
+            raise _Done
 
     def handle_data(self, data):
-        if not self._current_data_stack:
+        if self._current_data_stack:
+            self._buf.append(data)
+
+    def close(self):
+        super().close()
+        if self._current_data_stack:
+            self._flush()
+
+    def _push(self, tag):
+        if self._current_data_stack:
+            self._flush()
+        self._current_data_stack.append(tag)
+
+    def _flush(self):
+        # Text for the innermost tracked tag is buffered and stripped once per run.
+        text = "".join(self._buf).strip()
+        self._buf.clear()
+        if not text:
             return
         key = self._current_data_stack[-1]
-        data = data.strip()
-        if not data:
-            return
         if key == "title":
-            self.page.title = (self.page.title or "") + data
+            self.page.title = (self.page.title or "") + text
         else:
-            self.page.headings.append((key, data))
+            self.page.headings.append((key, text))
+            if key == "h1":
+                self.page.has_h1 = True
 
 
 TLD_COORDS = {
@@ -125,9 +323,9 @@ def _recent_scores(audit: AuditRun) -> List[float]:
         except (TypeError, ValueError):
             continue
     if not values:
-        rng = Random(audit.pk or 0)
+        uniform = Random(audit.pk or 0).uniform
         base_score = float(audit.score or 0)
-        values = [max(0, min(100, base_score + rng.uniform(-8, 6))) for _ in range(3)]
+        values = [max(0.0, min(100.0, base_score + uniform(-8, 6))) for _ in range(3)]
     return values
 
 
@@ -164,8 +362,7 @@ def _build_score_chart(audit: AuditRun, base_font: str) -> Optional[Drawing]:
     return drawing
 
 
-def _build_finding_bar_chart(audit: AuditRun) -> Optional[Drawing]:
-    findings = list(audit.findings.all())
+def _build_finding_bar_chart(findings: List[AuditFinding]) -> Optional[Drawing]:
     if not findings:
         return None
     counter = Counter(finding.category for finding in findings)
@@ -220,31 +417,60 @@ def _build_region_map(audit: AuditRun, base_font: str) -> Optional[Drawing]:
     return drawing
 
 
+_HOST_RE = re.compile(r"^[a-z][a-z0-9+.-]*://(?:[^@/?#]*@)?([^/:?#]+)", re.I)
+
+
 def _collect_region_markers(base_url: str, links: Iterable[str]) -> List[Dict[str, float]]:
     markers: List[Dict[str, float]] = []
     seen: set[str] = set()
-    urls = [base_url, *links]
-    for url in urls:
-        host = urlparse(url).hostname or ""
-        if not host:
+    coords_for = TLD_COORDS.get
+    host_match = _HOST_RE.match
+    total = len(TLD_COORDS)
+    for url in chain((base_url,), links):
+        match = host_match(url)
+        if not match:
             continue
-        tld = host.split(".")[-1].lower()
+        tld = match.group(1).rsplit(".", 1)[-1].lower()
         if tld in seen:
             continue
-        coords = TLD_COORDS.get(tld)
+        coords = coords_for(tld)
         if not coords:
             continue
         seen.add(tld)
         lat, lon = coords
         markers.append({"label": tld.upper(), "lat": lat, "lon": lon})
+        if len(seen) == total:
+            break
     return markers
 
 
-def _previous_scores(website: Website, exclude_pk: Optional[int] = None, limit: int = 3) -> List[float]:
+PREVIOUS_SCORES_TTL = 300
+
+
+def _previous_scores_version_key(website_id: int) -> str:
+    return f"prevscores_ver:{website_id}"
+
+
+def invalidate_previous_scores(website_id: int) -> None:
+    key = _previous_scores_version_key(website_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _previous_scores_uncached(website: Website, limit: int) -> List[Tuple[int, int]]:
     qs = AuditRun.objects.filter(website=website, status=AuditRun.STATUS_COMPLETED)
-    if exclude_pk:
-        qs = qs.exclude(pk=exclude_pk)
-    scores = list(qs.order_by("-created_at").values_list("score", flat=True)[:limit])
+    return list(qs.order_by("-created_at").values_list("pk", "score")[:limit])
+
+
+def _previous_scores(website: Website, exclude_pk: Optional[int] = None, limit: int = 3) -> List[float]:
+    # Cache one extra row per website so the exclusion can be applied in Python
+    # and callers with different exclude_pk values share the same entry.
+    version = cache.get(_previous_scores_version_key(website.pk), 0)
+    key = f"prevscores:{website.pk}:{version}:{limit}"
+    rows = cache.get_or_set(key, lambda: _previous_scores_uncached(website, limit + 1), timeout=PREVIOUS_SCORES_TTL)
+    scores = [score for pk, score in rows if pk != exclude_pk][:limit]
     cleaned: List[float] = []
     for score in reversed(scores):
         try:
@@ -254,19 +480,82 @@ def _previous_scores(website: Website, exclude_pk: Optional[int] = None, limit:
     return cleaned
 
 
-def _safe_request(url: str, timeout: int = 15) -> Tuple[int, bytes, float]:
-    request = urllib.request.Request(url, headers={"User-Agent": "QA-Tool/1.0"})
-    ssl_context = ssl.create_default_context()
-    start = time.monotonic()
+_PER_HOST_CONCURRENCY = 4
+# Entries live only while a request holds the semaphore (``with _host_slot(url)`` keeps it alive),
+# so the long-running worker does not accumulate one semaphore per host it has ever audited.
+_host_slots: "weakref.WeakValueDictionary[str, threading.BoundedSemaphore]" = weakref.WeakValueDictionary()
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(_PER_HOST_CONCURRENCY)
+    return slot
+
+
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+MAX_DECLARED_BYTES = 50 * 1000 * 1000
+_READ_CHUNK_BYTES = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    def __init__(self, status: int, length: int):
+        super().__init__(f"response declares {length} bytes (limit {MAX_DECLARED_BYTES})")
+        self.status = status
+        self.length = length
+
+
+def _declared_length(response) -> int:
     try:
-        with urllib.request.urlopen(request, timeout=timeout, context=ssl_context) as response:
-            body = response.read()
-            status = getattr(response, "status", response.getcode())
-    except HTTPError as exc:
-        body = exc.read() if hasattr(exc, "read") else b""
-        status = getattr(exc, "code", 0)
+        return int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+_HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+def _header_charset(response) -> Optional[str]:
+    # Not response.encoding: requests falls back to ISO-8859-1 for any text/* without a charset,
+    # which would override the page's own <meta charset>.
+    match = _HEADER_CHARSET_RE.search(response.headers.get("Content-Type") or "")
+    return match.group(1) if match else None
+
+
+def _safe_request(
+    url: str, timeout: int = 15, max_bytes: int = MAX_RESPONSE_BYTES, method: str = "GET"
+) -> Tuple[int, bytes, float, Optional[str]]:
+    """Fetch ``url`` and return ``(status, body, elapsed_ms, charset)``.
+
+    The body is read in chunks and truncated at ``max_bytes``; a body whose
+    length equals ``max_bytes`` should be treated as possibly incomplete.
+    Responses declaring more than ``MAX_DECLARED_BYTES`` raise
+    ``ResponseTooLarge`` before any of the body is read. ``charset`` is the
+    ``Content-Type`` header's charset parameter, or ``None``.
+    """
+    start = time.monotonic()
+    chunks: List[bytes] = []
+    remaining = max_bytes
+    # Parallel link sampling and multi-page runs share hosts; cap in-flight requests per host.
+    with _host_slot(url), _SESSION.request(
+        method, url, timeout=timeout, allow_redirects=True, stream=True
+    ) as response:
+        status = response.status_code
+        charset = _header_charset(response)
+        length = _declared_length(response) if method != "HEAD" else 0
+        if length > MAX_DECLARED_BYTES:
+            raise ResponseTooLarge(status, length)
+        for chunk in response.iter_content(_READ_CHUNK_BYTES):
+            chunks.append(chunk[:remaining])
+            remaining -= len(chunk)
+            if remaining <= 0:
+                break
+    body = b"".join(chunks)
     elapsed_ms = int((time.monotonic() - start) * 1000)
-    return status, body, elapsed_ms
+    return status, body, elapsed_ms, charset
 
 
 def _pdf_text(value, default: str = "") -> str:
@@ -279,165 +568,328 @@ def _pdf_text(value, default: str = "") -> str:
     return escape(text, quote=False)
 
 
-def _parse_html(content: bytes, url: str) -> ParsedPage:
+def _parse_html_lexbor(html: str, url: str) -> ParsedPage:
+    tree = LexborHTMLParser(html)
+    page = ParsedPage(url=url)
+    title_node = tree.css_first("title")
+    if title_node is not None:
+        page.title = title_node.text(strip=True) or None
+    page.links = [href for href in (node.attributes.get("href") for node in tree.css("a[href]")) if href][
+        :MAX_PARSED_LINKS
+    ]
+    for node in tree.css("img"):
+        if len(page.images) >= MAX_PARSED_IMAGES:
+            break
+        alt = node.attributes.get("alt") or ""
+        page.images.append((node.attributes.get("src") or "", alt))
+        if not alt.strip():
+            page.missing_alt_count += 1
+    for node in tree.css("h1, h2, h3"):
+        text = node.text(separator=" ", strip=True)
+        if text:
+            page.headings.append((node.tag, text))
+            if node.tag == "h1":
+                page.has_h1 = True
+    page.forms = len(tree.css("form"))
+    for node in tree.css("meta[name][content], meta[property][content]"):
+        attrs = node.attributes
+        name = attrs.get("name") or attrs.get("property")
+        content = attrs.get("content")
+        if name and content:
+            name = name.lower()
+            page.meta[name] = content
+            if name == "description":
+                page.has_meta_description = True
+    for node in tree.css("link[rel][href]"):
+        rel = node.attributes.get("rel")
+        if rel and node.attributes.get("href") and _is_icon_rel(rel):
+            page.has_icon = True
+            break
+    return page
+
+
+_FEED_CHUNK_BYTES = 32 * 1024
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+# Browsers decode these labels as windows-1252, which only adds printable characters in 0x80-0x9f.
+_ENCODING_OVERRIDES = {"latin-1": "cp1252", "ascii": "cp1252"}
+
+
+def _lookup_encoding(label: Optional[str]) -> Optional[str]:
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label).name
+    except LookupError:
+        return None
+    return _ENCODING_OVERRIDES.get(name, name)
+
+
+def _sniff_encoding(content: bytes, declared: Optional[str] = None) -> str:
+    """Same precedence as browsers: BOM, then the HTTP charset, then ``<meta charset>``."""
+    for bom, encoding in _BOM_ENCODINGS:
+        if content.startswith(bom):
+            return encoding
+    encoding = _lookup_encoding(declared)
+    if encoding:
+        return encoding
+    # Browsers only honour a <meta charset> in the first 1024 bytes.
+    match = _META_CHARSET_RE.search(content, 0, 1024)
+    if match:
+        encoding = _lookup_encoding(match.group(1).decode("ascii"))
+        if encoding:
+            return encoding
+    return "utf-8"
+
+
+def _parse_html(content: bytes, url: str, charset: Optional[str] = None) -> ParsedPage:
+    encoding = _sniff_encoding(content, charset)
+    if LexborHTMLParser is not None:
+        return _parse_html_lexbor(content.decode(encoding, errors="replace"), url)
     parser = _PageParser()
     parser.page.url = url
+    # Decode and feed in slices so the fallback never holds a second full copy of the page as str.
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    view = memoryview(content)
     try:
-        parser.feed(content.decode("utf-8", errors="ignore"))
-    finally:
+        for offset in range(0, len(view), _FEED_CHUNK_BYTES):
+            parser.feed(decoder.decode(view[offset:offset + _FEED_CHUNK_BYTES]))
+        parser.feed(decoder.decode(b"", final=True))
+    except _Done:
+        pass
+    else:
         parser.close()
     return parser.page
 
 
-def _absolutize_links(base_url: str, links: Iterable[str]) -> List[str]:
-    abs_links: List[str] = []
+_SKIPPED_LINK_PREFIXES = ("javascript:", "mailto:", "tel:", "#")
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if parts.port is not None and _DEFAULT_PORTS.get(scheme) == parts.port:
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path, parts.query, ""))
+
+
+def _absolutize_links(base_url: str, links: Iterable[str]) -> Iterator[str]:
+    """Yield each distinct absolute URL once, in first-seen order.
+
+    Nav and footer anchors repeat on every page, so raw hrefs are deduplicated
+    before ``urljoin`` and the joined URLs again after normalisation.
+    """
+    seen_raw = set()
+    seen = set()
     for link in links:
         if not link:
             continue
         link = link.strip()
-        if link.startswith("javascript:"):
+        if not link or link in seen_raw or link.lower().startswith(_SKIPPED_LINK_PREFIXES):
+            continue
+        seen_raw.add(link)
+        try:
+            absolute = _normalize_url(urljoin(base_url, link))
+        except ValueError:
+            # Malformed ports or IPv6 literals; the link is unusable either way.
             continue
-        abs_links.append(urljoin(base_url, link))
-    return abs_links
+        if absolute not in seen:
+            seen.add(absolute)
+            yield absolute
 
 
-def _sample_link_health(base_url: str, links: List[str], limit: int = 5) -> Dict[str, int]:
-    samples = {}
-    for link in links[:limit]:
+HOST_PROBE_TTL = 600
+_HEAD_UNSUPPORTED = frozenset({405, 501})
+
+
+def _probe_status(url: str) -> int:
+    # Only the status matters here; fall back to a short GET for servers that refuse HEAD.
+    status, _, _, _ = _safe_request(url, method="HEAD")
+    if status in _HEAD_UNSUPPORTED:
+        status, _, _, _ = _safe_request(url, max_bytes=_READ_CHUNK_BYTES)
+    return status
+
+
+def _robots_status(target_url: str) -> Optional[int]:
+    cache_key = f"robots:{urlparse(target_url).netloc.lower()}"
+    status = cache.get(cache_key)
+    if status is None:
         try:
-            status, _, _ = _safe_request(link)
-            samples[link] = status
+            status = _probe_status(urljoin(target_url, "/robots.txt"))
         except Exception:
-            samples[link] = 0
-    return samples
+            return None
+        cache.set(cache_key, status, HOST_PROBE_TTL)
+    return status if status < 400 else None
+
+
+def _link_status(link: str) -> int:
+    cache_key = f"linkstatus:{md5(link.encode()).hexdigest()}"
+    status = cache.get(cache_key)
+    if status is not None:
+        return status
+    try:
+        status = _probe_status(link)
+    except ResponseTooLarge as exc:
+        status = exc.status
+    except Exception:
+        # Connection errors are often transient; only cache real HTTP answers.
+        return 0
+    cache.set(cache_key, status, HOST_PROBE_TTL)
+    return status
+
+
+def _sample_link_health(base_url: str, links: List[str], limit: int = 5, executor: Optional[Executor] = None) -> Dict[str, int]:
+    targets = links[:limit]
+    if not targets:
+        return {}
+    return dict(zip(targets, (executor or _FETCH_POOL).map(_link_status, targets)))
+
+
+SEVERITY_LOW = AuditFinding.SEVERITY_LOW
+SEVERITY_MEDIUM = AuditFinding.SEVERITY_MEDIUM
+SEVERITY_HIGH = AuditFinding.SEVERITY_HIGH
+
+# Static parts of each finding; _evaluate_findings only fills in the description.
+_FINDING_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "unreachable": {
+        "category": "availability",
+        "severity": SEVERITY_HIGH,
+        "title": "Homepage is unreachable",
+        "recommendation": "Verify hosting availability and ensure the server returns 200 OK for the homepage.",
+    },
+    "slow_response": {
+        "category": "performance",
+        "severity": SEVERITY_MEDIUM,
+        "title": "Slow initial response",
+        "recommendation": "Optimize server-side rendering, add caching, and compress assets to improve TTFB.",
+    },
+    "missing_description": {
+        "category": "seo",
+        "severity": SEVERITY_MEDIUM,
+        "title": "Missing meta description",
+        "recommendation": "Add a concise, keyword-rich meta description under 160 characters to improve SERP visibility.",
+    },
+    "missing_favicon": {
+        "category": "branding",
+        "severity": SEVERITY_LOW,
+        "title": "No favicon detected",
+        "recommendation": "Add a `<link rel=\"icon\">` tag pointing to a favicon for brand recognition.",
+    },
+    "missing_h1": {
+        "category": "structure",
+        "severity": SEVERITY_LOW,
+        "title": "No H1 heading",
+        "recommendation": "Provide a unique H1 heading describing the page contents.",
+    },
+    "missing_alt": {
+        "category": "accessibility",
+        "severity": SEVERITY_MEDIUM,
+        "title": "Images without alternative text",
+        "recommendation": "Add meaningful `alt` attributes to all informative images to comply with WCAG guidelines.",
+    },
+    "broken_links": {
+        "category": "links",
+        "severity": SEVERITY_HIGH,
+        "title": "Broken links detected",
+        "recommendation": "Update or remove broken links to maintain trust and SEO health.",
+    },
+    "missing_robots": {
+        "category": "seo",
+        "severity": SEVERITY_LOW,
+        "title": "robots.txt not reachable",
+        "recommendation": "Provide a robots.txt to guide search engine crawlers and list your sitemap.",
+    },
+}
+
+
+def _finding(key: str, description: str) -> Dict[str, str]:
+    finding = dict(_FINDING_TEMPLATES[key])
+    finding["description"] = description
+    return finding
 
 
 def _evaluate_findings(page: ParsedPage, response_status: int, response_time_ms: int, robots_status: Optional[int], link_statuses: Dict[str, int]) -> List[Dict[str, str]]:
     findings: List[Dict[str, str]] = []
-    severity = AuditFinding.SEVERITY_MEDIUM if response_status >= 400 else AuditFinding.SEVERITY_LOW
     if response_status >= 400 or response_status == 0:
-        findings.append(
-            {
-                "category": "availability",
-                "severity": AuditFinding.SEVERITY_HIGH,
-                "title": "Homepage is unreachable",
-                "description": f"The main URL returned status {response_status}.",
-                "recommendation": "Verify hosting availability and ensure the server returns 200 OK for the homepage.",
-            }
-        )
+        findings.append(_finding("unreachable", f"The main URL returned status {response_status}."))
 
     if response_time_ms > 2000:
         findings.append(
-            {
-                "category": "performance",
-                "severity": AuditFinding.SEVERITY_MEDIUM,
-                "title": "Slow initial response",
-                "description": f"Measured response time {response_time_ms}ms exceeds the 2s threshold.",
-                "recommendation": "Optimize server-side rendering, add caching, and compress assets to improve TTFB.",
-            }
+            _finding("slow_response", f"Measured response time {response_time_ms}ms exceeds the 2s threshold.")
         )
 
-    if not page.meta.get("description"):
-        findings.append(
-            {
-                "category": "seo",
-                "severity": AuditFinding.SEVERITY_MEDIUM,
-                "title": "Missing meta description",
-                "description": "The page does not define a meta description tag.",
-                "recommendation": "Add a concise, keyword-rich meta description under 160 characters to improve SERP visibility.",
-            }
-        )
+    if not page.has_meta_description:
+        findings.append(_finding("missing_description", "The page does not define a meta description tag."))
 
-    if not any(key.startswith("link::icon") or "icon" in key for key in page.meta):
-        findings.append(
-            {
-                "category": "branding",
-                "severity": AuditFinding.SEVERITY_LOW,
-                "title": "No favicon detected",
-                "description": "Browsers did not detect a favicon link element.",
-                "recommendation": "Add a `<link rel=\"icon\">` tag pointing to a favicon for brand recognition.",
-            }
-        )
+    if not page.has_icon:
+        findings.append(_finding("missing_favicon", "Browsers did not detect a favicon link element."))
 
-    if not any(tag == "h1" for tag, _ in page.headings):
-        findings.append(
-            {
-                "category": "structure",
-                "severity": AuditFinding.SEVERITY_LOW,
-                "title": "No H1 heading",
-                "description": "The page markup is missing a primary `<h1>` heading.",
-                "recommendation": "Provide a unique H1 heading describing the page contents.",
-            }
-        )
+    if not page.has_h1:
+        findings.append(_finding("missing_h1", "The page markup is missing a primary `<h1>` heading."))
 
-    missing_alt = [src for src, alt in page.images if not alt.strip()]
-    if missing_alt:
+    if page.missing_alt_count:
         findings.append(
-            {
-                "category": "accessibility",
-                "severity": AuditFinding.SEVERITY_MEDIUM,
-                "title": "Images without alternative text",
-                "description": f"Detected {len(missing_alt)} image(s) missing alt descriptions.",
-                "recommendation": "Add meaningful `alt` attributes to all informative images to comply with WCAG guidelines.",
-            }
+            _finding("missing_alt", f"Detected {page.missing_alt_count} image(s) missing alt descriptions.")
         )
 
     broken_links = [link for link, status in link_statuses.items() if status >= 400 or status == 0]
     if broken_links:
         truncated_links = ", ".join(Truncator(link).chars(80) for link in broken_links[:3])
-        findings.append(
-            {
-                "category": "links",
-                "severity": AuditFinding.SEVERITY_HIGH,
-                "title": "Broken links detected",
-                "description": f"Sampled links returned errors: {truncated_links}.",
-                "recommendation": "Update or remove broken links to maintain trust and SEO health.",
-            }
-        )
+        findings.append(_finding("broken_links", f"Sampled links returned errors: {truncated_links}."))
 
     if robots_status is None:
         findings.append(
-            {
-                "category": "seo",
-                "severity": AuditFinding.SEVERITY_LOW,
-                "title": "robots.txt not reachable",
-                "description": "Crawler directives file `/robots.txt` was not found or returned an error.",
-                "recommendation": "Provide a robots.txt to guide search engine crawlers and list your sitemap.",
-            }
+            _finding("missing_robots", "Crawler directives file `/robots.txt` was not found or returned an error.")
         )
 
     return findings
 
 
+_BASE_SCORE = 99
+_SEVERITY_PENALTIES = {
+    SEVERITY_LOW: 5,
+    SEVERITY_MEDIUM: 10,
+    SEVERITY_HIGH: 20,
+}
+
+
 def _calculate_score(page: ParsedPage, findings: List[Dict[str, str]]) -> int:
-    base = 99
-    penalties = {
-        AuditFinding.SEVERITY_LOW: 5,
-        AuditFinding.SEVERITY_MEDIUM: 10,
-        AuditFinding.SEVERITY_HIGH: 20,
-    }
-    for finding in findings:
-        base -= penalties.get(finding["severity"], 5)
-    return max(0, base)
+    counts = Counter(finding["severity"] for finding in findings)
+    penalty = sum(_SEVERITY_PENALTIES.get(severity, 5) * count for severity, count in counts.items())
+    return max(0, _BASE_SCORE - penalty)
+
+
+_RESULT_FIELDS = ["status", "summary", "score", "response_time_ms", "content_length", "metadata", "updated_at"]
+_STORED_META_KEYS = ("description", "keywords")
+MAX_STORED_HEADINGS = 20
 
 
 def run_audit(website: Website, url: Optional[str] = None, user=None) -> AuditRun:
-    target_url = url or website.url
-    audit = AuditRun.objects.create(website=website, url=target_url, created_by=user)
+    audit = AuditRun.objects.create(website=website, url=url or website.url, created_by=user)
+    return _perform_audit(audit)
+
+
+def _perform_audit(audit: AuditRun) -> AuditRun:
+    website = audit.website
+    target_url = audit.url
 
     try:
-        status, body, response_time = _safe_request(target_url)
-        page = _parse_html(body, target_url)
-        absolute_links = _absolutize_links(target_url, page.links)
+        status, body, response_time, charset = _safe_request(target_url)
+        robots_future = _FETCH_POOL.submit(_robots_status, target_url)
+        page = _parse_html(body, target_url, charset)
+        absolute_links = list(_absolutize_links(target_url, page.links))
         link_statuses = _sample_link_health(target_url, absolute_links)
-
-        robots_status: Optional[int]
-        try:
-            robots_status, _, _ = _safe_request(urljoin(target_url, "/robots.txt"))
-            if robots_status >= 400:
-                robots_status = None
-        except Exception:
-            robots_status = None
+        robots_status = robots_future.result()
 
         findings = _evaluate_findings(page, status, response_time, robots_status, link_statuses)
         score = _calculate_score(page, findings)
@@ -450,66 +902,229 @@ def run_audit(website: Website, url: Optional[str] = None, user=None) -> AuditRu
         metadata = {
             "status": status,
             "title": page.title,
-            "meta": page.meta,
+            # Only the tags reports use; full meta dicts and heading lists bloat every row.
+            "meta": {key: page.meta[key] for key in _STORED_META_KEYS if key in page.meta},
+            "has_favicon": page.has_icon,
             "forms": page.forms,
-            "headings": page.headings,
+            "headings": page.headings[:MAX_STORED_HEADINGS],
             "link_samples": link_statuses,
             "robots_status": robots_status,
+            "body_truncated": len(body) >= MAX_RESPONSE_BYTES,
         }
         metadata["region_markers"] = _collect_region_markers(target_url, absolute_links)
         metadata["score_history"] = _previous_scores(website, exclude_pk=audit.pk)
         audit.metadata = metadata
-        audit.save()
 
-        for finding in findings:
-            AuditFinding.objects.create(audit=audit, **finding)
+        with transaction.atomic():
+            audit.save(update_fields=_RESULT_FIELDS)
 
-        AuditMetric.objects.bulk_create(
-            [
-                AuditMetric(audit=audit, label="Response status", value=str(status)),
-                AuditMetric(audit=audit, label="Response time (ms)", value=str(response_time)),
-                AuditMetric(audit=audit, label="HTML bytes", value=str(len(body))),
-                AuditMetric(audit=audit, label="Total links parsed", value=str(len(absolute_links))),
-                AuditMetric(audit=audit, label="Images parsed", value=str(len(page.images))),
-            ]
-        )
+            AuditFinding.objects.bulk_create(
+                [AuditFinding(audit=audit, **finding) for finding in findings], batch_size=100
+            )
+
+            AuditMetric.objects.bulk_create(
+                [
+                    AuditMetric(audit=audit, label="Response status", value=str(status)),
+                    AuditMetric(audit=audit, label="Response time (ms)", value=str(response_time)),
+                    AuditMetric(audit=audit, label="HTML bytes", value=str(len(body))),
+                    AuditMetric(audit=audit, label="Total links parsed", value=str(len(absolute_links))),
+                    AuditMetric(audit=audit, label="Images parsed", value=str(len(page.images))),
+                ]
+            )
 
     except Exception as exc:
+        logger.warning("Audit %s of %s failed: %s", audit.pk, target_url, exc, exc_info=True)
         audit.status = AuditRun.STATUS_FAILED
         audit.summary = f"Audit failed: {exc}"
-        audit.save()
+        audit.save(update_fields=["status", "summary", "updated_at"])
+
+    return audit
+
+
+AUDIT_STALE_AFTER = timedelta(minutes=getattr(settings, "AUDIT_STALE_MINUTES", 15))
+_CLAIM_BATCH = 10
+
+
+def fail_stale_audits(now=None) -> int:
+    """Fail audits stuck pending or running, e.g. after a worker restart or a killed request."""
+    cutoff = (now or timezone.now()) - AUDIT_STALE_AFTER
+    stale = AuditRun.objects.filter(status__in=AuditRun.IN_PROGRESS_STATUSES, updated_at__lt=cutoff)
+    count = stale.update(
+        status=AuditRun.STATUS_FAILED,
+        summary="Audit failed: it did not finish in time. Run it again.",
+        updated_at=timezone.now(),
+    )
+    if count:
+        logger.warning("Marked %s stale audit(s) as failed", count)
+    return count
+
+
+def _claim_audit(audit_id: int) -> bool:
+    # A conditional UPDATE is the claim, so two workers can never run the same row, on any database.
+    return bool(
+        AuditRun.objects.filter(pk=audit_id, status=AuditRun.STATUS_PENDING).update(
+            status=AuditRun.STATUS_RUNNING, updated_at=timezone.now()
+        )
+    )
+
+
+def claim_next_audit() -> Optional[AuditRun]:
+    """Oldest pending audit, now marked running; ``None`` when the queue is empty."""
+    pending = AuditRun.objects.filter(status=AuditRun.STATUS_PENDING).order_by("created_at")
+    for audit_id in pending.values_list("pk", flat=True)[:_CLAIM_BATCH]:
+        if _claim_audit(audit_id):
+            return AuditRun.objects.select_related("website", "billed_subscription__plan").get(pk=audit_id)
+    return None
+
+
+def process_audit(audit: AuditRun, prerender_pdf: bool = True) -> AuditRun:
+    """Run a claimed audit and bill its subscription if it completes."""
+    try:
+        _perform_audit(audit)
+        if audit.status == AuditRun.STATUS_COMPLETED:
+            if audit.billed_subscription_id:
+                audit.billed_subscription.increment_usage()
+            if prerender_pdf:
+                # Off the request path, so the download is a cache hit (given a shared cache).
+                generate_audit_pdf(audit)
+    except Exception:
+        logger.exception("Audit %s crashed after it was claimed", audit.pk)
+        AuditRun.objects.filter(pk=audit.pk, status__in=AuditRun.IN_PROGRESS_STATUSES).update(
+            status=AuditRun.STATUS_FAILED, summary="Audit failed: internal error.", updated_at=timezone.now()
+        )
+    return audit
+
+
+def reserve_audit_slot(subscription: UserSubscription) -> bool:
+    """Whether ``subscription`` can take one more audit, counting ones queued but not yet billed.
+
+    Call inside ``transaction.atomic()`` and create the pending audit before the block commits. The
+    guarded UPDATE keeps the subscription row locked until then (on SQLite it takes the database
+    write lock), so concurrent requests reserve one at a time and each sees the others' pending rows.
+    """
+    quota = subscription.plan.audit_quota
+    rows = UserSubscription.objects.filter(pk=subscription.pk)
+    if quota is not None:
+        rows = rows.filter(audits_used__lt=quota)
+    if not rows.update(updated_at=timezone.now()):
+        return False
+    if quota is None:
+        return True
+    subscription.refresh_from_db(fields=["audits_used"])
+    # Rows past the stale cutoff are failed by the next sweep (worker poll or status check) and never billed.
+    in_flight = subscription.billed_audits.filter(
+        status__in=AuditRun.IN_PROGRESS_STATUSES, updated_at__gte=timezone.now() - AUDIT_STALE_AFTER
+    ).count()
+    return subscription.has_capacity(reserved=in_flight)
+
+
+def create_pending_audit(
+    website: Website, url: Optional[str] = None, user=None, subscription: Optional[UserSubscription] = None
+) -> AuditRun:
+    """Record a pending audit: the durable job row that ``start_audit`` or ``run_audit_worker`` runs.
+
+    It survives web restarts, and ``fail_stale_audits`` fails it if nothing finishes it in time.
+    ``subscription`` is billed only when the audit completes.
+    """
+    return AuditRun.objects.create(
+        website=website, url=url or website.url, created_by=user, billed_subscription=subscription
+    )
+
 
+def start_audit(audit: AuditRun) -> AuditRun:
+    """Run a pending audit now, unless ``AUDIT_USE_WORKER`` leaves it to ``run_audit_worker``."""
+    if getattr(settings, "AUDIT_USE_WORKER", False):
+        return audit
+    if _claim_audit(audit.pk):
+        audit.status = AuditRun.STATUS_RUNNING
+        process_audit(audit, prerender_pdf=False)
     return audit
 
 
+def enqueue_audit(
+    website: Website, url: Optional[str] = None, user=None, subscription: Optional[UserSubscription] = None
+) -> AuditRun:
+    """``create_pending_audit`` then ``start_audit``, for callers that don't reserve quota first."""
+    return start_audit(create_pending_audit(website, url=url, user=user, subscription=subscription))
+
+
+def _run_audit_in_worker(website: Website, url: str, user=None) -> AuditRun:
+    try:
+        return run_audit(website, url, user)
+    finally:
+        # Worker threads get their own connections; don't leave them open.
+        connections.close_all()
+
+
 def run_multi_page_audit(website: Website, urls: Iterable[str], user=None) -> List[AuditRun]:
+    page_urls = list(urls)
     audits = []
-    for page_url in urls:
-        try:
-            audits.append(run_audit(website, page_url, user))
-        except Exception:
-            continue
+    if connection.vendor == "sqlite" or len(page_urls) < 2:
+        # SQLite serialises writers, so concurrent audits just fail with "database is locked".
+        for page_url in page_urls:
+            try:
+                audits.append(run_audit(website, page_url, user))
+            except Exception:
+                continue
+        return audits
+    with ThreadPoolExecutor(max_workers=min(_FETCH_WORKERS, len(page_urls))) as executor:
+        futures = [executor.submit(_run_audit_in_worker, website, page_url, user) for page_url in page_urls]
+        for future in futures:
+            try:
+                audits.append(future.result())
+            except Exception:
+                continue
     return audits
 
 
-def generate_audit_pdf(audit: AuditRun) -> bytes:
-    buffer = BytesIO()
+AUDIT_PDF_TTL = 86400
+PDF_FINDING_FIELDS = ("id", "audit_id", "category", "severity", "title", "description", "recommendation")
+PDF_METRIC_FIELDS = ("id", "audit_id", "label", "value")
+
 
+def _audit_pdf_cache_key(audit: AuditRun) -> str:
+    # Saving the audit, editing its findings or metrics (see apps.py) or renaming its website bumps an
+    # updated_at here, which retires the old entry.
+    audit_stamp = int(audit.updated_at.timestamp() * 1_000_000)
+    website_stamp = int(audit.website.updated_at.timestamp() * 1_000_000)
+    return f"auditpdf:{audit.pk}:{audit_stamp}:{website_stamp}"
+
+
+def generate_audit_pdf(audit: AuditRun) -> bytes:
+    if not AuditRun._meta.get_field("website").is_cached(audit):
+        audit = AuditRun.objects.select_related("website").get(pk=audit.pk)
+    cache_key = _audit_pdf_cache_key(audit)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    pdf_bytes = _render_audit_pdf(audit)
+    cache.set(cache_key, pdf_bytes, AUDIT_PDF_TTL)
+    return pdf_bytes
+
+
+def _register_fonts() -> str:
+    if "Roboto" in pdfmetrics.getRegisteredFontNames():
+        return "Roboto"
     try:
         pdfmetrics.registerFont(TTFont("Roboto", "Roboto-Regular.ttf"))
-        base_font = "Roboto"
     except Exception:
-        base_font = "Helvetica"
+        return "Helvetica"
+    return "Roboto"
 
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        leftMargin=0.9 * inch,
-        rightMargin=0.9 * inch,
-        topMargin=0.9 * inch,
-        bottomMargin=0.9 * inch,
-    )
 
+_BASE_FONT = _register_fonts()
+
+
+_SEVERITY_PALETTE = {
+    AuditFinding.SEVERITY_LOW: colors.HexColor("#6366f1"),
+    AuditFinding.SEVERITY_MEDIUM: colors.HexColor("#f97316"),
+    AuditFinding.SEVERITY_HIGH: colors.HexColor("#ef4444"),
+}
+_DEFAULT_BADGE_COLOR = colors.HexColor("#0ea5e9")
+
+
+@lru_cache(maxsize=2)
+def _build_styles(base_font: str) -> Dict[str, ParagraphStyle]:
     styles = getSampleStyleSheet()
     styles["Normal"].fontName = base_font
     styles["Heading1"].fontName = base_font
@@ -564,6 +1179,44 @@ def generate_audit_pdf(audit: AuditRun) -> bytes:
         leading=15,
         textColor=colors.HexColor("#1e293b"),
     )
+    badge_style = ParagraphStyle("Badge", parent=summary_style, textColor=colors.white)
+    return {
+        "title": title_style,
+        "subtitle": subtitle_style,
+        "kicker": kicker_style,
+        "meta": meta_style,
+        "section": section_style,
+        "summary": summary_style,
+        "badge": badge_style,
+    }
+
+
+# Build the stylesheet with the font registration so the first PDF request doesn't pay for it.
+_build_styles(_BASE_FONT)
+
+
+def _render_audit_pdf(audit: AuditRun) -> bytes:
+    buffer = BytesIO()
+
+    base_font = _BASE_FONT
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        leftMargin=0.9 * inch,
+        rightMargin=0.9 * inch,
+        topMargin=0.9 * inch,
+        bottomMargin=0.9 * inch,
+    )
+
+    styles = _build_styles(base_font)
+    title_style = styles["title"]
+    subtitle_style = styles["subtitle"]
+    kicker_style = styles["kicker"]
+    meta_style = styles["meta"]
+    section_style = styles["section"]
+    summary_style = styles["summary"]
+    badge_style = styles["badge"]
 
     def _header_footer(canvas, document):
         canvas.saveState()
@@ -635,7 +1288,8 @@ def generate_audit_pdf(audit: AuditRun) -> bytes:
     if score_chart:
         story.append(KeepTogether([score_chart, Spacer(1, 12)]))
 
-    finding_chart = _build_finding_bar_chart(audit)
+    findings = list(audit.findings.only(*PDF_FINDING_FIELDS))
+    finding_chart = _build_finding_bar_chart(findings)
     if finding_chart:
         story.append(KeepTogether([finding_chart, Spacer(1, 12)]))
 
@@ -646,21 +1300,15 @@ def generate_audit_pdf(audit: AuditRun) -> bytes:
     story.append(Paragraph("Summary", section_style))
     story.append(Paragraph(_pdf_text(audit.summary, "No summary available."), summary_style))
 
-    findings = list(audit.findings.all())
     if findings:
         story.append(Paragraph("Findings", section_style))
-        severity_palette = {
-            AuditFinding.SEVERITY_LOW: colors.HexColor("#6366f1"),
-            AuditFinding.SEVERITY_MEDIUM: colors.HexColor("#f97316"),
-            AuditFinding.SEVERITY_HIGH: colors.HexColor("#ef4444"),
-        }
         for finding in findings:
-            badge_color = severity_palette.get(finding.severity, colors.HexColor("#0ea5e9"))
+            badge_color = _SEVERITY_PALETTE.get(finding.severity, _DEFAULT_BADGE_COLOR)
             finding_data = [
                 [
                     Paragraph(
                         f"<b>{escape(finding.category.title(), quote=False)}</b> – {escape(finding.severity.title(), quote=False)}",
-                        ParagraphStyle("Badge", parent=summary_style, textColor=colors.white),
+                        badge_style,
                     ),
                     "",
                 ],
@@ -699,7 +1347,7 @@ def generate_audit_pdf(audit: AuditRun) -> bytes:
             story.append(finding_table)
             story.append(Spacer(1, 12))
 
-    metrics = list(audit.metrics.all())
+    metrics = list(audit.metrics.only(*PDF_METRIC_FIELDS))
     if metrics:
         story.append(Paragraph("Key Metrics", section_style))
         metrics_data = [["Metric", "Value"]]
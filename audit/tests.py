@@ -1,15 +1,55 @@
+import codecs
+import socket
+import threading
+from datetime import datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from importlib import import_module
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-from audit.models import AuditFinding, AuditMetric, AuditRun, Website
-from audit.services import ParsedPage, run_audit
+from audit.admin import SubscriptionPlanAdmin, qa_admin_site
+from audit.models import (
+    PLAN_CATALOG_CACHE_KEY,
+    AuditFinding,
+    AuditMetric,
+    AuditRun,
+    SubscriptionPlan,
+    UserSubscription,
+    Website,
+)
+from audit.services import (
+    AUDIT_STALE_AFTER,
+    _SESSION,
+    ParsedPage,
+    _absolutize_links,
+    _host_slot,
+    _host_slots,
+    _audit_pdf_cache_key,
+    _dns_cache,
+    _parse_html,
+    _safe_request,
+    _sample_link_health,
+    claim_next_audit,
+    enqueue_audit,
+    fail_stale_audits,
+    generate_audit_pdf,
+    process_audit,
+    reserve_audit_slot,
+    run_audit,
+)
 
 # Create your tests here.
 
 
 class RunAuditTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.website = Website.objects.create(name="Example", url="https://example.com")
 
     @patch("audit.services._sample_link_health")
@@ -17,8 +57,8 @@ class RunAuditTests(TestCase):
     @patch("audit.services._safe_request")
     def test_run_audit_successful_flow(self, mock_safe_request, mock_parse_html, mock_sample_link_health):
         mock_safe_request.side_effect = [
-            (200, b"<html></html>", 120),
-            (200, b"", 5),
+            (200, b"<html></html>", 120, "utf-8"),
+            (200, b"", 5, None),
         ]
         mock_parse_html.return_value = ParsedPage(
             url="https://example.com",
@@ -55,10 +95,452 @@ class RunAuditTests(TestCase):
 
     @patch("audit.services._safe_request", side_effect=RuntimeError("boom"))
     def test_run_audit_handles_failure(self, mock_safe_request):
-        audit = run_audit(self.website)
+        with self.assertLogs("audit.services", level="WARNING"):
+            audit = run_audit(self.website)
 
         self.assertEqual(audit.status, AuditRun.STATUS_FAILED)
         self.assertTrue(audit.summary.startswith("Audit failed:"))
         self.assertEqual(AuditRun.objects.count(), 1)
         self.assertEqual(AuditFinding.objects.count(), 0)
         self.assertEqual(AuditMetric.objects.count(), 0)
+
+
+
+class AuditQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SubscriptionPlan.bootstrap_defaults()
+        self.user = get_user_model().objects.create_user("queue-user", password="pw")
+        self.subscription = UserSubscription.ensure_trial(self.user)
+        self.website = Website.objects.create(name="Example", url="https://example.com")
+
+    @override_settings(AUDIT_USE_WORKER=False)
+    @patch("audit.services._perform_audit")
+    def test_enqueue_runs_inline_and_bills_completed_audit(self, mock_perform):
+        def complete(audit):
+            self.assertEqual(AuditRun.objects.get(pk=audit.pk).status, AuditRun.STATUS_RUNNING)
+            audit.status = AuditRun.STATUS_COMPLETED
+            audit.save(update_fields=["status", "updated_at"])
+            return audit
+
+        mock_perform.side_effect = complete
+        audit = enqueue_audit(self.website, user=self.user, subscription=self.subscription)
+
+        self.assertEqual(audit.status, AuditRun.STATUS_COMPLETED)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.audits_used, 1)
+
+    @override_settings(AUDIT_USE_WORKER=True)
+    @patch("audit.services.generate_audit_pdf")
+    @patch("audit.services._perform_audit")
+    def test_worker_claims_pending_audit_once(self, mock_perform, mock_pdf):
+        audit = enqueue_audit(self.website, user=self.user, subscription=self.subscription)
+        self.assertEqual(audit.status, AuditRun.STATUS_PENDING)
+        mock_perform.assert_not_called()
+
+        claimed = claim_next_audit()
+        self.assertEqual(claimed.pk, audit.pk)
+        self.assertEqual(claimed.status, AuditRun.STATUS_RUNNING)
+        self.assertIsNone(claim_next_audit())
+
+        mock_perform.side_effect = lambda run: setattr(run, "status", AuditRun.STATUS_FAILED) or run
+        process_audit(claimed)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.audits_used, 0)
+        mock_pdf.assert_not_called()
+
+    @patch("audit.services._perform_audit", side_effect=RuntimeError("boom"))
+    def test_crashed_audit_is_logged_and_failed(self, mock_perform):
+        audit = AuditRun.objects.create(website=self.website, url=self.website.url, status=AuditRun.STATUS_RUNNING)
+
+        with self.assertLogs("audit.services", level="ERROR"):
+            process_audit(audit)
+
+        self.assertEqual(AuditRun.objects.get(pk=audit.pk).status, AuditRun.STATUS_FAILED)
+
+    def test_fail_stale_audits_only_touches_old_in_progress_rows(self):
+        old = timezone.now() - AUDIT_STALE_AFTER - timedelta(minutes=1)
+        stale_pending = AuditRun.objects.create(website=self.website, url=self.website.url)
+        stale_running = AuditRun.objects.create(
+            website=self.website, url=self.website.url, status=AuditRun.STATUS_RUNNING
+        )
+        fresh = AuditRun.objects.create(website=self.website, url=self.website.url)
+        done = AuditRun.objects.create(website=self.website, url=self.website.url, status=AuditRun.STATUS_COMPLETED)
+        AuditRun.objects.filter(pk__in=[stale_pending.pk, stale_running.pk, done.pk]).update(updated_at=old)
+
+        with self.assertLogs("audit.services", level="WARNING"):
+            self.assertEqual(fail_stale_audits(), 2)
+
+        statuses = dict(AuditRun.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[stale_pending.pk], AuditRun.STATUS_FAILED)
+        self.assertEqual(statuses[stale_running.pk], AuditRun.STATUS_FAILED)
+        self.assertEqual(statuses[fresh.pk], AuditRun.STATUS_PENDING)
+        self.assertEqual(statuses[done.pk], AuditRun.STATUS_COMPLETED)
+
+    def test_reserve_audit_slot_counts_queued_audits_but_not_stale_ones(self):
+        self.assertTrue(reserve_audit_slot(self.subscription))
+
+        queued = AuditRun.objects.create(
+            website=self.website, url=self.website.url, billed_subscription=self.subscription
+        )
+        self.assertFalse(reserve_audit_slot(self.subscription))
+
+        AuditRun.objects.filter(pk=queued.pk).update(updated_at=timezone.now() - AUDIT_STALE_AFTER)
+        self.assertTrue(reserve_audit_slot(self.subscription))
+
+        UserSubscription.objects.filter(pk=self.subscription.pk).update(audits_used=1)
+        self.assertFalse(reserve_audit_slot(self.subscription))
+
+    @override_settings(AUDIT_USE_WORKER=True)
+    @patch("audit.views.fail_stale_audits")
+    def test_dashboard_post_reserves_the_quota_before_queueing(self, mock_sweep):
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse("audit-dashboard"), {"url": "https://first.example.com"})
+        self.assertRedirects(response, reverse("audit-dashboard"), fetch_redirect_response=False)
+        response = self.client.post(reverse("audit-dashboard"), {"url": "https://second.example.com"})
+        self.assertRedirects(response, reverse("pricing"), fetch_redirect_response=False)
+
+        self.assertEqual(
+            list(AuditRun.objects.values_list("url", "status", "billed_subscription")),
+            [("https://first.example.com", AuditRun.STATUS_PENDING, self.subscription.pk)],
+        )
+        self.assertFalse(Website.objects.filter(url="https://second.example.com").exists())
+        mock_sweep.assert_not_called()
+
+    def test_status_endpoint_returns_json_errors_and_fails_stuck_audit(self):
+        audit = AuditRun.objects.create(website=self.website, url=self.website.url, created_by=self.user)
+        status_url = reverse("audit-status", args=[audit.pk])
+
+        response = self.client.get(status_url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(status_url).json()["status"], AuditRun.STATUS_PENDING)
+
+        stuck_since = timezone.now() - AUDIT_STALE_AFTER - timedelta(minutes=1)
+        AuditRun.objects.filter(pk=audit.pk).update(updated_at=stuck_since)
+        with self.assertLogs("audit.services", level="WARNING"):
+            self.assertEqual(self.client.get(status_url).json()["status"], AuditRun.STATUS_FAILED)
+
+
+class SampleLinkHealthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch("audit.services._safe_request")
+    def test_samples_are_limited_and_errors_map_to_zero(self, mock_safe_request):
+        def fake_request(url, **kwargs):
+            if url.endswith("/down"):
+                raise OSError("connection refused")
+            return (404 if url.endswith("/missing") else 200), b"", 1, None
+
+        mock_safe_request.side_effect = fake_request
+        links = [f"https://example.com/{path}" for path in ("ok", "missing", "down", "extra")]
+
+        samples = _sample_link_health("https://example.com", links, limit=3)
+
+        self.assertEqual(
+            samples,
+            {
+                "https://example.com/ok": 200,
+                "https://example.com/missing": 404,
+                "https://example.com/down": 0,
+            },
+        )
+
+    @patch("audit.services._safe_request", return_value=(200, b"", 1, None))
+    def test_statuses_are_cached_across_samples(self, mock_safe_request):
+        links = ["https://example.com/ok"]
+
+        _sample_link_health("https://example.com", links)
+        samples = _sample_link_health("https://example.com", links)
+
+        self.assertEqual(samples, {"https://example.com/ok": 200})
+        mock_safe_request.assert_called_once()
+
+
+class ParseHtmlTests(TestCase):
+    HTML = (
+        b'<html><head><meta charset="utf-8"><title>Caf\xc3\xa9</title>'
+        b'<meta name="Description" content="Menu"><link rel="icon" href="/f.ico"></head>'
+        b'<body><h1>Hello</h1><h2>Sub <b>head</b></h2><img src="/a.png"><img src="/b.png" alt="B">'
+        b'<a href="/one">1</a><a href="">x</a><a href="https://other.test/">2</a><form></form></body></html>'
+    )
+
+    def test_lexbor_and_fallback_parsers_agree(self):
+        lexbor_page = _parse_html(self.HTML, "https://example.com/")
+        with patch("audit.services.LexborHTMLParser", None):
+            fallback_page = _parse_html(self.HTML, "https://example.com/")
+
+        self.assertEqual(lexbor_page, fallback_page)
+        self.assertEqual(lexbor_page.title, "Caf\u00e9")
+        self.assertEqual(lexbor_page.links, ["/one", "https://other.test/"])
+        self.assertEqual(lexbor_page.missing_alt_count, 1)
+        self.assertTrue(lexbor_page.has_meta_description)
+        self.assertTrue(lexbor_page.has_icon)
+
+    def test_http_charset_is_used_after_the_bom_and_before_meta(self):
+        latin = "<title>Caf\u00e9</title>".encode("latin-1")
+        self.assertEqual(_parse_html(latin, "https://example.com/").title, "Caf\ufffd")
+        self.assertEqual(_parse_html(latin, "https://example.com/", "ISO-8859-1").title, "Caf\u00e9")
+
+        mislabelled = b'<meta charset="utf-8">' + latin
+        self.assertEqual(_parse_html(mislabelled, "https://example.com/", "iso-8859-1").title, "Caf\u00e9")
+
+        bom = codecs.BOM_UTF8 + "<title>Caf\u00e9</title>".encode()
+        self.assertEqual(_parse_html(bom, "https://example.com/", "ISO-8859-1").title, "Caf\u00e9")
+        self.assertEqual(_parse_html(bom[3:], "https://example.com/", "no-such-charset").title, "Caf\u00e9")
+
+    def test_absolutize_links_normalises_and_deduplicates(self):
+        links = [
+            "/about",
+            " /about ",
+            "HTTPS://Example.com:443/about#team",
+            "mailto:hi@example.com",
+            "#top",
+            "javascript:void(0)",
+            "http://example.com:80/contact?x=1",
+            "http://[::1",
+            "",
+            None,
+        ]
+
+        self.assertEqual(
+            list(_absolutize_links("https://example.com/", links)),
+            ["https://example.com/about", "http://example.com/contact?x=1"],
+        )
+
+
+class AuditPdfCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.website = Website.objects.create(name="Example", url="https://example.com")
+        self.audit = AuditRun.objects.create(
+            website=self.website, url=self.website.url, status=AuditRun.STATUS_COMPLETED
+        )
+
+    @patch("audit.services._render_audit_pdf", side_effect=[b"first", b"second", b"third"])
+    def test_pdf_is_cached_until_the_audit_or_website_changes(self, mock_render):
+        self.assertEqual(generate_audit_pdf(self.audit), b"first")
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"first")
+
+        later = self.audit.updated_at + timedelta(seconds=1)
+        Website.objects.filter(pk=self.website.pk).update(updated_at=later)
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"second")
+
+        AuditRun.objects.filter(pk=self.audit.pk).update(updated_at=later)
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"third")
+        self.assertEqual(mock_render.call_count, 3)
+
+    @patch("audit.services._render_audit_pdf", side_effect=[b"first", b"second", b"third"])
+    def test_editing_findings_or_metrics_retires_the_cached_pdf(self, mock_render):
+        finding = AuditFinding.objects.create(
+            audit=self.audit, category="SEO", severity="low", title="Title", description="", recommendation=""
+        )
+        metric = AuditMetric.objects.create(audit=self.audit, label="Response status", value="200")
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"first")
+
+        finding.title = "Edited"
+        finding.save()
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"second")
+
+        metric.delete()
+        self.assertEqual(generate_audit_pdf(AuditRun.objects.get(pk=self.audit.pk)), b"third")
+
+        AuditRun.objects.get(pk=self.audit.pk).delete()
+        self.assertFalse(AuditFinding.objects.exists())
+
+    def test_cache_key_includes_both_timestamps(self):
+        key = _audit_pdf_cache_key(self.audit)
+        self.assertTrue(key.startswith(f"auditpdf:{self.audit.pk}:"))
+        self.website.updated_at += timedelta(microseconds=1)
+        self.assertNotEqual(_audit_pdf_cache_key(self.audit), key)
+
+
+class WebsiteIsoCodeTests(TestCase):
+    def test_iso_code_follows_the_url(self):
+        website = Website.objects.create(url="https://shop.co.uk/")
+        self.assertEqual(website.iso_code, "GB")
+        self.assertEqual(Website.objects.create(url="https://example.xyz").iso_code, "")
+
+        website.url = "https://shop.de"
+        website.save(update_fields=["url"])
+        website.refresh_from_db()
+        self.assertEqual(website.iso_code, "DE")
+
+    def test_migration_backfills_existing_rows(self):
+        Website.objects.create(url="https://a.ca")
+        Website.objects.create(url="https://b.xyz")
+        Website.objects.update(iso_code="")
+        migration = import_module("audit.migrations.0007_website_iso_code")
+
+        migration.backfill_iso_codes(apps, None)
+
+        self.assertEqual(
+            dict(Website.objects.values_list("url", "iso_code")),
+            {"https://a.ca": "CA", "https://b.xyz": ""},
+        )
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SubscriptionPlan.bootstrap_defaults()
+
+    def test_region_counts_group_by_iso_code(self):
+        for url in ("https://a.com", "https://b.org", "https://c.de", "https://d.xyz"):
+            Website.objects.create(url=url)
+
+        region_summary = self.client.get(reverse("audit-dashboard")).context["region_summary"]
+
+        self.assertEqual(
+            [(entry["iso"], entry["count"]) for entry in region_summary],
+            [("US", 2), ("DE", 1)],
+        )
+
+    def test_audit_velocity_buckets_by_week(self):
+        website = Website.objects.create(url="https://example.com")
+        today = timezone.localdate()
+        week_start = timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+        for created_at in (
+            week_start,
+            week_start + timedelta(hours=1),
+            week_start - timedelta(weeks=1) + timedelta(days=2),
+            week_start - timedelta(weeks=7),
+            week_start - timedelta(weeks=7, seconds=1),
+        ):
+            audit = AuditRun.objects.create(website=website, url=website.url)
+            AuditRun.objects.filter(pk=audit.pk).update(created_at=created_at)
+
+        velocity = self.client.get(reverse("audit-dashboard")).context["audit_velocity"]
+
+        self.assertEqual([week["count"] for week in velocity], [1, 0, 0, 0, 0, 0, 1, 2])
+        self.assertEqual(velocity[-1]["week"], week_start.strftime("%b %d"))
+
+    @override_settings(AUDIT_USE_WORKER=True)
+    def test_resubmitting_a_url_only_saves_a_changed_name(self):
+        user = get_user_model().objects.create_user("dash-user", password="pw")
+        user.is_staff = True
+        user.save()
+        self.client.force_login(user)
+        website = Website.objects.create(name="Example", url="https://example.com")
+        stamp = website.updated_at
+
+        self.client.post(reverse("audit-dashboard"), {"url": website.url, "name": "Example"})
+        website.refresh_from_db()
+        self.assertEqual(website.updated_at, stamp)
+
+        self.client.post(reverse("audit-dashboard"), {"url": website.url, "name": "Renamed"})
+        website.refresh_from_db()
+        self.assertEqual(website.name, "Renamed")
+        self.assertGreater(website.updated_at, stamp)
+        self.assertEqual(AuditRun.objects.filter(website=website).count(), 2)
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", 'text/html; charset="ISO-8859-1"')
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AuditHTTPAdapterTests(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        _dns_cache.clear()
+        self.addCleanup(_dns_cache.clear)
+
+    def test_second_connection_to_a_host_skips_getaddrinfo(self):
+        url = f"http://localhost:{self.server.server_port}/"
+        with patch("socket.getaddrinfo", wraps=socket.getaddrinfo) as mock_getaddrinfo:
+            for _ in range(2):
+                # Connection: close forces a fresh connection, so each request resolves again.
+                response = _SESSION.get(url, headers={"Connection": "close"}, timeout=5)
+                self.assertEqual(response.content, b"ok")
+
+        lookups = [call for call in mock_getaddrinfo.call_args_list if call.args[0] == "localhost"]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn(("localhost", self.server.server_port), _dns_cache)
+
+
+    def test_safe_request_returns_the_header_charset(self):
+        url = f"http://localhost:{self.server.server_port}/"
+        status, body, _, charset = _safe_request(url)
+        self.assertEqual((status, body, charset), (200, b"ok", "ISO-8859-1"))
+
+class HostSlotTests(TestCase):
+    def test_slots_are_shared_per_host_and_dropped_when_released(self):
+        with _host_slot("https://Example.com/a"):
+            self.assertIs(_host_slot("https://example.com/b"), _host_slots["example.com"])
+            self.assertIsNot(_host_slot("https://other.test/"), _host_slots["example.com"])
+        self.assertNotIn("example.com", _host_slots)
+        self.assertNotIn("other.test", _host_slots)
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SubscriptionPlan.bootstrap_defaults()
+
+    def active_slugs(self):
+        return [plan.slug for plan in SubscriptionPlan.active_plans()]
+
+    def test_save_and_delete_clear_the_active_plan_cache(self):
+        self.assertIn("growth", self.active_slugs())
+
+        plan = SubscriptionPlan.objects.get(slug="growth")
+        plan.is_active = False
+        plan.save()
+        self.assertNotIn("growth", self.active_slugs())
+
+        SubscriptionPlan.objects.get(slug="scale").delete()
+        self.assertNotIn("scale", self.active_slugs())
+
+    def test_admin_bulk_actions_clear_the_plan_caches(self):
+        model_admin = SubscriptionPlanAdmin(SubscriptionPlan, qa_admin_site)
+        request = RequestFactory().post("/")
+        self.assertIn("growth", self.active_slugs())
+        cache.set(PLAN_CATALOG_CACHE_KEY, {"plans": []})
+
+        with patch.object(model_admin, "message_user"):
+            model_admin.deactivate_plans(request, SubscriptionPlan.objects.filter(slug="growth"))
+        self.assertNotIn("growth", self.active_slugs())
+        self.assertIsNone(cache.get(PLAN_CATALOG_CACHE_KEY))
+
+        with patch.object(model_admin, "message_user"):
+            model_admin.activate_plans(request, SubscriptionPlan.objects.filter(slug="growth"))
+        self.assertIn("growth", self.active_slugs())
+
+
+class EnsureTrialTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SubscriptionPlan.bootstrap_defaults()
+        self.user = get_user_model().objects.create_user("trial-user", password="pw")
+
+    def test_ensure_trial_is_idempotent(self):
+        first = UserSubscription.ensure_trial(self.user)
+        second = UserSubscription.ensure_trial(self.user)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(UserSubscription.objects.filter(user=self.user, is_trial=True).count(), 1)
+
+    def test_concurrent_trial_insert_falls_back_to_the_winner(self):
+        # An active trial on another plan stands in for the row a concurrent request just inserted.
+        other_trial = SubscriptionPlan.objects.create(
+            slug="pilot", name="Pilot", billing_interval=SubscriptionPlan.BILLING_TRIAL, price_cents=0
+        )
+        winner = UserSubscription.start_new(self.user, other_trial)
+
+        self.assertEqual(UserSubscription.ensure_trial(self.user).pk, winner.pk)
+        self.assertEqual(UserSubscription.objects.filter(user=self.user, is_trial=True).count(), 1)
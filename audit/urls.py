@@ -12,7 +12,8 @@ urlpatterns = [
     path("pricing/gateway/<slug:slug>/", views.payment_gateway_redirect, name="payment-gateway"),
     path("checkout/<slug:slug>/", views.create_checkout_session, name="checkout"),
     path("audit/<int:pk>/download/", views.download_audit_pdf, name="audit-download"),
-    path("robots.txt", views.robots_txt, name="robots"),
+    path("audit/<int:pk>/status/", views.audit_status, name="audit-status"),
+    path("websites/search/", views.website_search, name="website-search"),
     path("favicon.ico", RedirectView.as_view(url=static("audit/favicon.svg"), permanent=True)),
     path("accounts/login/", views.AuditLoginView.as_view(), name="login"),
     path("accounts/signup/", views.signup, name="signup"),
@@ -1,24 +1,59 @@
 import uuid
-from collections import Counter, defaultdict
-from datetime import timedelta
-from urllib.parse import urlparse
+from datetime import datetime, time, timedelta
+from io import BytesIO
+from itertools import chain
+from operator import itemgetter
 
 from django.contrib import messages
-from django.contrib.auth import login as auth_login
+from django.contrib.auth import get_user_model, login as auth_login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.views import LoginView
-from django.db.models import Avg, Count, Q, Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import TruncWeek
+from django.http import FileResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 
-from audit.models import AuditRun, Payment, SubscriptionPlan, UserSubscription, Website
-from audit.services import generate_audit_pdf, run_audit
-
-
-def _complete_subscription(request, user, plan, *, provider="manual", payment_reference="", metadata=None):
+from audit.models import (
+    PLAN_CATALOG_CACHE_KEY,
+    PLANS_CACHE_TTL,
+    AuditFinding,
+    AuditMetric,
+    AuditRun,
+    Payment,
+    SubscriptionPlan,
+    UserSubscription,
+    Website,
+)
+from audit.services import (
+    AUDIT_STALE_AFTER,
+    PDF_FINDING_FIELDS,
+    PDF_METRIC_FIELDS,
+    create_pending_audit,
+    fail_stale_audits,
+    generate_audit_pdf,
+    reserve_audit_slot,
+    start_audit,
+)
+
+
+# Everything checkout reads from the plan, including period_delta().
+CHECKOUT_PLAN_FIELDS = ("id", "slug", "name", "price_cents", "currency", "billing_interval", "trial_days")
+
+# Fixed redirect targets; HttpResponseRedirect takes these directly instead of going through resolve_url().
+AUDIT_DASHBOARD_URL = reverse_lazy("audit-dashboard")
+PRICING_URL = reverse_lazy("pricing")
+LOGIN_URL = reverse_lazy("login")
+
+
+def _complete_subscription(
+    request, user, plan, *, existing=None, provider="manual", payment_reference="", metadata=None
+):
+    """``existing`` is the caller's ``active_for_user`` result, so it isn't fetched twice."""
     metadata = metadata or {}
     if plan.billing_interval == SubscriptionPlan.BILLING_TRIAL:
         UserSubscription.ensure_trial(user)
@@ -30,33 +65,29 @@ def _complete_subscription(request, user, plan, *, provider="manual", payment_re
         messages.error(request, "Payment reference required for paid plans")
         raise ValueError("Payment reference required for paid plans")
 
-    if requires_payment:
-        Payment.objects.create(
-            user=user,
-            plan=plan,
-            amount_cents=plan.price_cents,
-            currency=plan.currency,
-            provider=provider,
-            provider_reference=payment_reference or f"ref-{uuid.uuid4()}",
-            status=Payment.STATUS_SUCCEEDED,
-            metadata={"mode": plan.billing_interval, **metadata},
-        )
-
-    existing = UserSubscription.objects.active_for_user(user)
-    if existing and existing.plan_id == plan.id:
-        existing.refresh_period()
-    else:
-        UserSubscription.start_new(user, plan)
+    with transaction.atomic():
+        if requires_payment:
+            Payment.objects.create(
+                user=user,
+                plan=plan,
+                amount_cents=plan.price_cents,
+                currency=plan.currency,
+                provider=provider,
+                provider_reference=payment_reference or f"ref-{uuid.uuid4()}",
+                status=Payment.STATUS_SUCCEEDED,
+                metadata={"mode": plan.billing_interval, **metadata},
+            )
+        UserSubscription.upsert_for_plan(user, plan, existing)
 
 
 def payment_checkout(request, slug):
     if request.method not in {"GET", "POST"}:
-        return redirect("pricing")
+        return HttpResponseRedirect(PRICING_URL)
     plan = get_object_or_404(SubscriptionPlan, slug=slug, is_active=True)
     user = request.user
     if not user.is_authenticated:
         messages.info(request, "Sign in to activate a subscription.")
-        return redirect(f"{reverse('login')}?next={request.path}")
+        return HttpResponseRedirect(f"{LOGIN_URL}?next={request.path}")
 
     existing = UserSubscription.objects.active_for_user(user)
 
@@ -71,6 +102,7 @@ def payment_checkout(request, slug):
                 request,
                 user,
                 plan,
+                existing=existing,
                 provider="inline" if provider == "inline" else "manual",
                 payment_reference=payment_reference,
                 metadata={"source": provider},
@@ -79,7 +111,7 @@ def payment_checkout(request, slug):
             messages.error(request, "Add a payment reference before continuing.")
             return redirect("payment-checkout", slug=plan.slug)
         messages.success(request, f"You are now subscribed to {plan.name}.")
-        return redirect("audit-dashboard")
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
 
     return render(
         request,
@@ -96,7 +128,7 @@ def payment_gateway_redirect(request, slug):
     plan = get_object_or_404(SubscriptionPlan, slug=slug, is_active=True)
     if not request.user.is_authenticated:
         messages.info(request, "Sign in to proceed with payment.")
-        return redirect(f"{reverse('login')}?next={request.path}")
+        return HttpResponseRedirect(f"{LOGIN_URL}?next={request.path}")
     request.session["gateway_plan_slug"] = plan.slug
     request.session["gateway_next"] = request.GET.get("next")
     context = {
@@ -110,15 +142,15 @@ def payment_gateway_redirect(request, slug):
 def payment_gateway_callback(request):
     status = request.GET.get("status")
     plan_slug = request.session.pop("gateway_plan_slug", None)
-    redirect_url = request.session.pop("gateway_next", None) or reverse("pricing")
+    redirect_url = request.session.pop("gateway_next", None) or PRICING_URL
     if not plan_slug:
         messages.error(request, "Your payment session expired. Try again.")
-        return redirect("pricing")
+        return HttpResponseRedirect(PRICING_URL)
     plan = get_object_or_404(SubscriptionPlan, slug=plan_slug, is_active=True)
     user = request.user
     if not user.is_authenticated:
         messages.error(request, "Sign in to finalize your subscription.")
-        return redirect("login")
+        return HttpResponseRedirect(LOGIN_URL)
     if status != "success":
         messages.warning(request, "Payment was cancelled. You can try again anytime.")
         return redirect(redirect_url)
@@ -127,43 +159,13 @@ def payment_gateway_callback(request):
         request,
         user,
         plan,
+        existing=UserSubscription.objects.active_for_user(user),
         provider="gateway",
         payment_reference=reference,
         metadata={"provider": "mock-gateway"},
     )
     messages.success(request, f"Payment confirmed. {plan.name} is now active.")
-    return redirect("audit-dashboard")
-
-TLD_TO_ISO = {
-    "com": "US",
-    "net": "US",
-    "org": "US",
-    "io": "GB",
-    "co": "US",
-    "ai": "US",
-    "app": "US",
-    "dev": "US",
-    "us": "US",
-    "ca": "CA",
-    "uk": "GB",
-    "ie": "IE",
-    "de": "DE",
-    "fr": "FR",
-    "nl": "NL",
-    "es": "ES",
-    "it": "IT",
-    "za": "ZA",
-    "ng": "NG",
-    "ke": "KE",
-    "in": "IN",
-    "sg": "SG",
-    "au": "AU",
-    "nz": "NZ",
-    "br": "BR",
-    "ar": "AR",
-    "mx": "MX",
-    "jp": "JP",
-}
+    return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
 
 ISO_MARKERS = {
     "US": {"name": "North America", "coords": [37.0902, -95.7129]},
@@ -194,229 +196,302 @@ class AuditLoginView(LoginView):
     redirect_authenticated_user = True
 
     def get_success_url(self):
-        return self.get_redirect_url() or reverse_lazy("audit-dashboard")
+        return self.get_redirect_url() or AUDIT_DASHBOARD_URL
+
+
+def _resolve_subscription(request):
+    # Memoised per request: the dashboard resolves it again on POST.
+    if hasattr(request, "_cached_subscription"):
+        return request._cached_subscription
+    user = request.user if request.user.is_authenticated else None
+    subscription = None
+    if user:
+        subscription = UserSubscription.objects.active_for_user(user) or UserSubscription.ensure_trial(user)
+        if subscription:
+            subscription.refresh_period()
+    request._cached_subscription = subscription
+    return subscription
 
 
-def robots_txt(request):
-    lines = [
-        "User-agent: *",
-        "Disallow:",
+def _build_plan_catalog():
+    active_plans = SubscriptionPlan.active_plans()
+    plans = [plan for plan in active_plans if plan.is_public]
+    plan_feature_sets = [(plan, frozenset(plan.features or ())) for plan in plans]
+    # dict.fromkeys is an ordered set: first-seen order, de-duplicated in C.
+    feature_catalog = list(dict.fromkeys(chain.from_iterable(plan.features or () for plan in plans)))
+    plan_feature_matrix = [
+        {
+            "feature": feature,
+            "plans": [
+                {
+                    "slug": plan.slug,
+                    "name": plan.name,
+                    "available": feature in feature_set,
+                }
+                for plan, feature_set in plan_feature_sets
+            ],
+        }
+        for feature in feature_catalog
     ]
-    content = "\n".join(lines) + "\n"
-    return HttpResponse(content, content_type="text/plain")
-
-
-def _resolve_subscription(user):
-    if not user:
-        return None
-    subscription = UserSubscription.objects.active_for_user(user)
-    if subscription:
-        subscription.refresh_period()
-        return subscription
-    subscription = UserSubscription.ensure_trial(user)
-    if subscription:
-        subscription.refresh_period()
-    return subscription
+    return {
+        "plans": plans,
+        "plan_feature_matrix": plan_feature_matrix,
+        "trial_plan": next((plan for plan in active_plans if plan.slug == "free-trial"), None),
+    }
+
+
+def _plan_catalog():
+    """Public plans, their feature matrix and the trial plan; cleared with the active-plans cache."""
+    return cache.get_or_set(PLAN_CATALOG_CACHE_KEY, _build_plan_catalog, PLANS_CACHE_TTL)
+
+
+RECENT_WEBSITE_LIMIT = 10
+WEBSITE_SEARCH_LIMIT = 20
+AUDIT_LIST_FIELDS = ("id", "status", "summary", "created_at", "created_by", "website__name", "website__url")
 
 
 def audit_dashboard(request):
-    latest_audit = None
-    findings = []
-    metrics = []
     current_user = request.user if request.user.is_authenticated else None
-    subscription = _resolve_subscription(current_user)
+    subscription = _resolve_subscription(request)
     remaining_audits = subscription.remaining_audits() if subscription else None
 
     if request.method == "POST":
         if not current_user:
             messages.error(request, "Sign in to run audits and manage your subscription.")
-            return redirect("login")
-        subscription = _resolve_subscription(current_user)
+            return HttpResponseRedirect(LOGIN_URL)
         if not subscription:
             messages.error(request, "Subscription could not be initialized. Try again later.")
-            return redirect("audit-dashboard")
-        if not (current_user.is_staff or subscription.has_capacity()):
-            messages.error(
-                request,
-                "Your complimentary audit is used up. Upgrade now to unlock deeper insights and unlimited reruns.",
-            )
-            return redirect("pricing")
+            return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
         website_id = (request.POST.get("website_id") or "").strip()
         url = (request.POST.get("url") or "").strip()
         name = (request.POST.get("name") or "").strip()
 
-        website = None
-
-        if website_id:
-            website = Website.objects.filter(pk=website_id).first()
-            if not website:
-                messages.error(request, "Selected website could not be found.")
-
-        if website is None and url:
-            website, _ = Website.objects.get_or_create(url=url, defaults={"name": name})
-            if name and website.name != name:
-                website.name = name
-                website.save(update_fields=["name"])
-
-        if website is None and not url:
-            messages.error(request, "Please choose a website or provide a new URL to audit.")
-        elif website is not None:
-            audit = run_audit(website, user=current_user)
-            latest_audit = audit
-            findings = list(audit.findings.all())
-            metrics = list(audit.metrics.all())
-
-            if audit.status == AuditRun.STATUS_COMPLETED:
-                messages.success(request, "Audit completed successfully.")
-                if subscription:
-                    subscription.increment_usage()
-            else:
-                messages.warning(request, "The audit encountered an issue. Check the summary below for details.")
-
-    audit_queryset = AuditRun.objects.select_related("website").prefetch_related("findings", "metrics").order_by("-created_at")
-    websites = list(Website.objects.order_by("name", "url").all())
-
-    status_counts = Counter(audit_queryset.values_list("status", flat=True))
+        with transaction.atomic():
+            # Queued audits are billed when they finish, so the pending row created below is the
+            # reservation; reserve_audit_slot() holds the subscription row until it commits.
+            if not (current_user.is_staff or reserve_audit_slot(subscription)):
+                messages.error(
+                    request,
+                    "Your complimentary audit is used up. Upgrade now to unlock deeper insights and unlimited reruns.",
+                )
+                return HttpResponseRedirect(PRICING_URL)
+
+            website = None
+
+            if website_id:
+                website = (
+                    Website.objects.defer("notes").filter(pk=website_id).first() if website_id.isdigit() else None
+                )
+                if not website:
+                    messages.error(request, "Selected website could not be found.")
+
+            if website is None and url:
+                website, _ = Website.objects.get_or_create(url=url, defaults={"name": name})
+                # Only a real rename touches the row, so resubmitting a URL keeps updated_at (and cached PDFs) as is.
+                if name and website.name != name:
+                    website.name = name
+                    website.save(update_fields=["name", "updated_at"])
+
+            # Every POST ends in a redirect (PRG), so invalid input never pays for a full dashboard render.
+            if website is None:
+                messages.error(request, "Please choose a website or provide a new URL to audit.")
+                return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
+            audit = create_pending_audit(website, user=current_user, subscription=subscription)
+
+        # Outside the transaction: an inline audit makes network calls and must not hold the lock.
+        audit = start_audit(audit)
+        if audit.status in AuditRun.IN_PROGRESS_STATUSES:
+            messages.info(request, "Audit queued. Results will appear below as soon as it finishes.")
+        elif audit.status == AuditRun.STATUS_COMPLETED:
+            messages.success(request, "Audit completed successfully.")
+        else:
+            messages.warning(request, "The audit encountered an issue. Check the summary below for details.")
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
+
+    audit_queryset = AuditRun.objects.select_related("website").order_by("-created_at")
+    # Lists render a handful of columns as plain dicts; only the single detailed audit needs
+    # model instances with findings and metrics.
+    list_queryset = audit_queryset.values(*AUDIT_LIST_FIELDS)
+    detail_queryset = audit_queryset.prefetch_related(
+        Prefetch("findings", queryset=AuditFinding.objects.only(*PDF_FINDING_FIELDS)),
+        Prefetch("metrics", queryset=AuditMetric.objects.only(*PDF_METRIC_FIELDS)),
+    )
+    # The picker starts with the user's recently audited sites; the rest load via website-search.
+    websites = (
+        list(
+            Website.objects.filter(audits__created_by=current_user)
+            .annotate(last_audit_at=Max("audits__created_at"))
+            .order_by("-last_audit_at")
+            .only("id", "name", "url")[:RECENT_WEBSITE_LIMIT]
+        )
+        if current_user
+        else []
+    )
+
+    # One conditional-aggregation pass replaces the status tally, averages and total count.
+    aggregates = audit_queryset.aggregate(
+        total=Count("id"),
+        avg_score=Avg("score"),
+        avg_response=Avg("response_time_ms"),
+        **{
+            status: Count("id", filter=Q(status=status))
+            for status, _label in AuditRun.STATUS_CHOICES
+        },
+    )
     chart_status_counts = [
-        {"status": status, "count": count}
-        for status, count in status_counts.items()
+        {"status": status, "count": aggregates[status]}
+        for status, _label in AuditRun.STATUS_CHOICES
+        if aggregates[status]
     ]
 
-    trend_values = list(
-        audit_queryset.values("created_at", "score").order_by("-created_at")[:12]
-    )
+    trend_values = list(audit_queryset.values_list("created_at", "score")[:12])
     chart_score_series = [
         {
-            "timestamp": value["created_at"].strftime("%Y-%m-%d"),
-            "score": value["score"],
+            "timestamp": created_at.strftime("%Y-%m-%d"),
+            "score": score,
         }
-        for value in reversed(trend_values)
-        if value["created_at"]
+        for created_at, score in reversed(trend_values)
+        if created_at
     ]
 
-    plan_totals = (
-        SubscriptionPlan.objects.filter(is_active=True)
-        .annotate(
-            active_count=Count(
-                "subscriptions",
-                filter=Q(subscriptions__status=UserSubscription.STATUS_ACTIVE),
-            )
-        )
-        .values("name", "slug", "active_count")
+    # Correlated subqueries rather than two joins, which would multiply subscription and payment rows.
+    # Revenue spans retired plans too, so only the chart is limited to active ones.
+    plan_totals = list(
+        SubscriptionPlan.objects.annotate(
+            active_count=Subquery(
+                UserSubscription.objects.filter(plan=OuterRef("pk"), status=UserSubscription.STATUS_ACTIVE)
+                .order_by()
+                .values("plan")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            revenue_cents=Subquery(
+                Payment.objects.filter(plan=OuterRef("pk"), status=Payment.STATUS_SUCCEEDED)
+                .order_by()
+                .values("plan")
+                .annotate(total=Sum("amount_cents"))
+                .values("total")
+            ),
+        ).values("name", "slug", "is_active", "active_count", "revenue_cents")
     )
     chart_plan_breakdown = [
         {"name": entry["name"], "slug": entry["slug"], "count": entry["active_count"] or 0}
         for entry in plan_totals
+        if entry["is_active"]
     ]
 
-    plans_qs = SubscriptionPlan.objects.filter(is_public=True, is_active=True).order_by("sort_order")
-    plans = list(plans_qs)
-    feature_catalog: list[str] = []
-    for plan in plans:
-        for feature in plan.features or []:
-            if feature not in feature_catalog:
-                feature_catalog.append(feature)
-    plan_feature_matrix = []
-    for feature in feature_catalog:
-        plan_feature_matrix.append(
-            {
-                "feature": feature,
-                "plans": [
-                    {
-                        "slug": plan.slug,
-                        "name": plan.name,
-                        "available": feature in (plan.features or []),
-                    }
-                    for plan in plans
-                ],
-            }
-        )
+    plan_catalog = _plan_catalog()
 
-    region_counts = defaultdict(int)
-    for site in websites:
-        parsed = urlparse(site.url)
-        host = parsed.hostname or ""
-        tld = host.split(".")[-1].lower() if host else ""
-        iso_code = TLD_TO_ISO.get(tld)
-        if iso_code:
-            region_counts[iso_code] += 1
+    region_counts = dict(
+        Website.objects.exclude(iso_code="")
+        .order_by()
+        .values("iso_code")
+        .annotate(count=Count("id"))
+        .values_list("iso_code", "count")
+    )
 
     region_markers = []
-    for iso_code, count in region_counts.items():
+    region_summary = []
+    for iso_code, count in sorted(region_counts.items(), key=itemgetter(1), reverse=True):
         marker_meta = ISO_MARKERS.get(iso_code)
-        if not marker_meta:
-            continue
-        region_markers.append(
+        region_summary.append(
             {
-                "name": marker_meta["name"],
-                "coords": marker_meta["coords"],
-                "count": count,
                 "iso": iso_code,
+                "name": marker_meta["name"] if marker_meta else iso_code,
+                "count": count,
             }
         )
+        if marker_meta:
+            region_markers.append(
+                {
+                    "name": marker_meta["name"],
+                    "coords": marker_meta["coords"],
+                    "count": count,
+                    "iso": iso_code,
+                }
+            )
 
-    region_summary = [
-        {
-            "iso": iso_code,
-            "name": ISO_MARKERS.get(iso_code, {}).get("name", iso_code),
-            "count": count,
-        }
-        for iso_code, count in sorted(region_counts.items(), key=lambda item: item[1], reverse=True)
-    ]
-
-    aggregates = audit_queryset.aggregate(
-        avg_score=Avg("score"),
-        avg_response=Avg("response_time_ms"),
-    )
-    total_audits = audit_queryset.count()
-    completed_audits = status_counts.get(AuditRun.STATUS_COMPLETED, 0)
-    failed_audits = status_counts.get(AuditRun.STATUS_FAILED, 0)
+    total_audits = aggregates["total"]
+    completed_audits = aggregates[AuditRun.STATUS_COMPLETED]
+    failed_audits = aggregates[AuditRun.STATUS_FAILED]
     completion_rate = int(round((completed_audits / total_audits) * 100)) if total_audits else 0
 
-    # Weekly audit velocity (last 8 weeks)
-    now = timezone.now()
-    start_of_week = now - timedelta(days=now.weekday())
+    # Weekly audit velocity (last 8 weeks), bucketed by TruncWeek in a single grouped query.
+    today = timezone.localdate()
+    start_of_week = timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+    first_week = start_of_week - timedelta(weeks=7)
+    weekly_counts = dict(
+        audit_queryset.filter(created_at__gte=first_week)
+        .annotate(week=TruncWeek("created_at"))
+        .order_by()
+        .values("week")
+        .annotate(count=Count("id"))
+        .values_list("week", "count")
+    )
     audit_velocity = []
     for i in range(7, -1, -1):
         week_start = start_of_week - timedelta(weeks=i)
-        week_end = week_start + timedelta(days=7)
-        count = audit_queryset.filter(created_at__gte=week_start, created_at__lt=week_end).count()
-        audit_velocity.append({"week": week_start.strftime("%b %d"), "count": count})
+        audit_velocity.append({"week": week_start.strftime("%b %d"), "count": weekly_counts.get(week_start, 0)})
+
+    recent_audits = list(list_queryset[:5])
+    user_recent_audits = (
+        list(list_queryset.filter(created_by=current_user)[:5])
+        if current_user
+        else []
+    )
 
     # Recent timeline events (audits, payments, subscriptions)
     timeline_events = []
-    for audit in audit_queryset.select_related("website")[:5]:
+    for audit in recent_audits:
         timeline_events.append(
             {
-                "timestamp": audit.created_at,
+                "timestamp": audit["created_at"],
                 "type": "audit",
-                "label": f"Audit for {audit.website.name or audit.website.url}",
-                "meta": audit.status.title(),
+                "label": f"Audit for {audit['website__name'] or audit['website__url']}",
+                "meta": audit["status"].title(),
             }
         )
-    for payment in Payment.objects.filter(status=Payment.STATUS_SUCCEEDED).select_related("plan")[:5]:
+    # Payments keep model instances for display_amount, but only load the columns it and the label need.
+    recent_payments = list(
+        Payment.objects.filter(status=Payment.STATUS_SUCCEEDED).only(
+            "created_at", "amount_cents", "currency", "plan_id"
+        )[:5]
+    )
+    username_key = f"user__{get_user_model().USERNAME_FIELD}"
+    recent_activations = list(
+        UserSubscription.objects.filter(status=UserSubscription.STATUS_ACTIVE).values(
+            "started_at", "plan_id", username_key
+        )[:5]
+    )
+    # Plan names come from the cached active plans instead of a join; retired plans are looked up in one query.
+    plan_names = {plan.id: plan.name for plan in SubscriptionPlan.active_plans()}
+    missing_plan_ids = (
+        {payment.plan_id for payment in recent_payments} | {row["plan_id"] for row in recent_activations}
+    ) - plan_names.keys()
+    if missing_plan_ids:
+        plan_names.update(SubscriptionPlan.objects.filter(id__in=missing_plan_ids).values_list("id", "name"))
+    for payment in recent_payments:
         timeline_events.append(
             {
                 "timestamp": payment.created_at,
                 "type": "payment",
-                "label": f"Payment for {payment.plan.name}",
-                "meta": payment.display_amount if hasattr(payment, "display_amount") else payment.amount_cents / 100,
+                "label": f"Payment for {plan_names[payment.plan_id]}",
+                "meta": payment.display_amount,
             }
         )
-    for subscription_event in UserSubscription.objects.filter(status=UserSubscription.STATUS_ACTIVE).select_related("plan")[:5]:
+    for subscription_event in recent_activations:
         timeline_events.append(
             {
-                "timestamp": subscription_event.started_at,
+                "timestamp": subscription_event["started_at"],
                 "type": "subscription",
-                "label": f"{subscription_event.plan.name} activated",
-                "meta": subscription_event.user.get_username(),
+                "label": f"{plan_names[subscription_event['plan_id']]} activated",
+                "meta": subscription_event[username_key],
             }
         )
-    timeline_events.sort(key=lambda item: item["timestamp"], reverse=True)
+    timeline_events.sort(key=itemgetter("timestamp"), reverse=True)
     timeline_events = timeline_events[:10]
 
-    revenue_data = Payment.objects.filter(status=Payment.STATUS_SUCCEEDED).aggregate(total=Sum("amount_cents"))
-    total_revenue = (revenue_data["total"] or 0) / 100
+    total_revenue = sum(entry["revenue_cents"] or 0 for entry in plan_totals) / 100
 
     smart_suggestions = []
     if completion_rate < 85:
@@ -426,30 +501,17 @@ def audit_dashboard(request):
     if not smart_suggestions:
         smart_suggestions.append("Fantastic performance! Schedule recurring audits to maintain momentum.")
 
-    if latest_audit is None:
-        user_latest = audit_queryset.filter(created_by=current_user).first() if current_user else None
-        latest_audit = user_latest or audit_queryset.first()
-        if latest_audit:
-            findings = list(latest_audit.findings.all())
-            metrics = list(latest_audit.metrics.all())
-
-    user_recent_audits = (
-        audit_queryset.filter(created_by=current_user).only(
-            "id", "status", "summary", "created_at", "website__name"
-        )[:5]
-        if current_user
-        else []
-    )
-
-    recent_audits = audit_queryset.only(
-        "id", "status", "summary", "created_at", "website__name"
-    )[:5]
+    # The newest audit (the user's own first) is already in the lists; load it in full once.
+    latest_audit = None
+    findings = []
+    metrics = []
+    latest_row = (user_recent_audits or recent_audits or [None])[0]
+    if latest_row:
+        latest_audit = detail_queryset.get(pk=latest_row["id"])
+        findings = list(latest_audit.findings.all())
+        metrics = list(latest_audit.metrics.all())
 
-    usage_percent = None
-    if subscription and getattr(subscription.plan, "audit_quota", 0):
-        quota = subscription.plan.audit_quota or 0
-        if quota > 0:
-            usage_percent = min(100, int(round((subscription.audits_used / quota) * 100)))
+    usage_percent = subscription.usage_percent() if subscription else None
 
     return render(
         request,
@@ -482,17 +544,16 @@ def audit_dashboard(request):
                 "avg_score": round(aggregates.get("avg_score") or 0, 1),
                 "avg_response": int(aggregates.get("avg_response") or 0),
             },
-            "plans": plans,
-            "plan_feature_matrix": plan_feature_matrix,
-            "trial_plan": SubscriptionPlan.get_trial_plan(),
+            "plans": plan_catalog["plans"],
+            "plan_feature_matrix": plan_catalog["plan_feature_matrix"],
+            "trial_plan": plan_catalog["trial_plan"],
         },
     )
 
 
 def pricing(request):
-    current_user = request.user if request.user.is_authenticated else None
-    subscription = _resolve_subscription(current_user)
-    plans = SubscriptionPlan.objects.filter(is_active=True).order_by("sort_order")
+    subscription = _resolve_subscription(request)
+    plans = SubscriptionPlan.active_plans()
     return render(
         request,
         "audit/pricing.html",
@@ -505,7 +566,7 @@ def pricing(request):
 
 def signup(request):
     if request.user.is_authenticated:
-        return redirect("audit-dashboard")
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
 
     form = UserCreationForm(request.POST or None)
     if request.method == "POST" and form.is_valid():
@@ -513,7 +574,7 @@ def signup(request):
         auth_login(request, user)
         UserSubscription.ensure_trial(user)
         messages.success(request, "Welcome aboard! Your free trial is ready.")
-        return redirect("audit-dashboard")
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
 
     return render(request, "registration/signup.html", {"form": form})
 
@@ -521,39 +582,63 @@ def signup(request):
 @login_required
 def create_checkout_session(request, slug):
     if request.method != "POST":
-        return redirect("pricing")
-    plan = get_object_or_404(SubscriptionPlan, slug=slug, is_active=True)
+        return HttpResponseRedirect(PRICING_URL)
+    plan = get_object_or_404(SubscriptionPlan.objects.only(*CHECKOUT_PLAN_FIELDS), slug=slug, is_active=True)
     user = request.user
     existing = UserSubscription.objects.active_for_user(user)
 
     if existing and existing.plan_id == plan.id:
         messages.info(request, "You are already on this plan.")
-        return redirect("pricing")
+        return HttpResponseRedirect(PRICING_URL)
 
     payment_reference = (request.POST.get("payment_reference") or "").strip()
     requires_payment = plan.price_cents > 0 and (existing is None or existing.plan_id != plan.id)
     if requires_payment and not payment_reference:
         messages.error(request, "Provide a payment reference before activating a paid plan.")
-        return redirect("pricing")
+        return HttpResponseRedirect(PRICING_URL)
 
     if plan.billing_interval == SubscriptionPlan.BILLING_TRIAL:
         UserSubscription.ensure_trial(user)
         messages.success(request, "Trial activated. Run your first audit now.")
-        return redirect("audit-dashboard")
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
     try:
         _complete_subscription(
             request,
             user,
             plan,
+            existing=existing,
             provider="manual",
             payment_reference=payment_reference,
             metadata={"source": "legacy-checkout"},
         )
     except ValueError:
         messages.error(request, "Provide a payment reference before activating a paid plan.")
-        return redirect("pricing")
+        return HttpResponseRedirect(PRICING_URL)
     messages.success(request, f"You are now subscribed to {plan.name}.")
-    return redirect("audit-dashboard")
+    return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
+
+
+@login_required
+def website_search(request):
+    query = (request.GET.get("q") or "").strip()
+    websites = Website.objects.order_by("name", "url")
+    if query:
+        websites = websites.filter(Q(name__icontains=query) | Q(url__icontains=query))
+    return JsonResponse({"results": list(websites.values("id", "name", "url")[:WEBSITE_SEARCH_LIMIT])})
+
+
+def audit_status(request, pk):
+    # JSON errors rather than a login redirect, so the dashboard poller stops instead of parsing HTML.
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+    audit = get_object_or_404(AuditRun.objects.only("id", "status", "score", "created_by", "updated_at"), pk=pk)
+    if not request.user.is_staff and audit.created_by_id != request.user.id:
+        return JsonResponse({"error": "forbidden"}, status=403)
+    stale = audit.updated_at < timezone.now() - AUDIT_STALE_AFTER
+    if audit.status in AuditRun.IN_PROGRESS_STATUSES and stale:
+        fail_stale_audits()
+        audit.refresh_from_db(fields=["status"])
+    return JsonResponse({"id": audit.pk, "status": audit.status, "score": audit.score})
 
 
 @login_required
@@ -561,8 +646,11 @@ def download_audit_pdf(request, pk):
     audit = get_object_or_404(AuditRun.objects.select_related("website"), pk=pk)
     if not request.user.is_staff and audit.created_by_id != request.user.id:
         messages.error(request, "You do not have access to this report.")
-        return redirect("audit-dashboard")
-    pdf_bytes = generate_audit_pdf(audit)
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = f"attachment; filename=audit-{audit.pk}.pdf"
-    return response
+        return HttpResponseRedirect(AUDIT_DASHBOARD_URL)
+    # BytesIO shares the cached bytes rather than copying them; FileResponse streams in blocks.
+    return FileResponse(
+        BytesIO(generate_audit_pdf(audit)),
+        as_attachment=True,
+        filename=f"audit-{audit.pk}.pdf",
+        content_type="application/pdf",
+    )
@@ -86,9 +86,34 @@ DATABASES = {
     'default': dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
         conn_max_age=600,
+        conn_health_checks=True,
     )
 }
 
+# Behind pgbouncer in transaction pooling mode, server-side cursors break across
+# pooled connections; set DATABASE_PGBOUNCER=1 when DATABASE_URL points at the pooler.
+if os.environ.get('DATABASE_PGBOUNCER', '').lower() in {'1', 'true', 'yes'}:
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+# Cache
+# Plan lists and rendered PDFs are cached. Set REDIS_URL so every web/worker process shares one cache;
+# the local-memory fallback is per process, so a plan change saved in one process leaves the others
+# serving the old plans for up to PLANS_CACHE_TTL (10 minutes).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,6 +152,17 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Root-level files such as robots.txt are served by WhiteNoise before the request reaches Django's URL resolver.
+WHITENOISE_ROOT = BASE_DIR / 'public'
+
+
+def _whitenoise_root_headers(headers, path, url):
+    # robots.txt is static for the life of a deploy; let browsers and CDNs keep it for a day.
+    if url == '/robots.txt':
+        headers['Cache-Control'] = 'public, max-age=86400'
+
+
+WHITENOISE_ADD_HEADERS_FUNCTION = _whitenoise_root_headers
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 USE_X_FORWARDED_HOST = True
@@ -141,6 +177,15 @@ SESSION_SAVE_EVERY_REQUEST = True
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 
+# Connection pooling for outbound audit requests (audit.services._SESSION).
+AUDIT_HTTP_POOL_CONNECTIONS = int(os.environ.get('AUDIT_HTTP_POOL_CONNECTIONS', '16'))
+AUDIT_HTTP_POOL_MAXSIZE = int(os.environ.get('AUDIT_HTTP_POOL_MAXSIZE', '32'))
+# With AUDIT_USE_WORKER, dashboard audits are stored as pending rows for `manage.py run_audit_worker`;
+# otherwise they run inside the request. No audit threads are started in the web process either way.
+AUDIT_USE_WORKER = os.environ.get('AUDIT_USE_WORKER', '').lower() in {'1', 'true', 'yes'}
+# Pending/running audits older than this are failed by fail_stale_audits().
+AUDIT_STALE_MINUTES = int(os.environ.get('AUDIT_STALE_MINUTES', '15'))
+
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/accounts/login/"
 